@@ -0,0 +1,252 @@
+"""Reporting figures for HR, kept as per-day counts in analytics_rollups.
+
+Finished days are rolled up once (python analytics.py rollup, or on the first
+report view that finds them missing) and never rescanned; a report sums the
+stored rows for its date range and adds today's activity, read live.
+Days are UTC, like every timestamp the app writes.
+"""
+import os
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from models import db, TrainingCourse, Nomination, ApprovalLog, AnalyticsRollup
+from exports import chunks
+from database import primary
+
+
+ANALYTICS_BATCH_DAYS = int(os.getenv("ANALYTICS_BATCH_DAYS", 31))
+
+# Upper bounds, in hours, of the submission-to-decision buckets. Medians are
+# interpolated within a bucket, since exact ones cannot be summed across days.
+LATENCY_BOUNDS = [1, 2, 4, 8, 12, 24, 48, 72, 120, 168, 336, 720, 1440, 2880]
+
+# Marks a day as rolled up, so days without any activity are not rescanned.
+ROLLED_UP = 'rolled_up'
+
+
+def day_of(value):
+    # func.date() gives a date on PostgreSQL and an ISO string on SQLite.
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def day_range(column, start, end):
+    return column >= datetime.combine(start, datetime.min.time()), \
+        column < datetime.combine(end, datetime.min.time())
+
+
+def nomination_counts(start, end):
+    day = func.date(Nomination.submission_date)
+    statement = select(day, Nomination.course_id, func.count()) \
+        .where(*day_range(Nomination.submission_date, start, end)) \
+        .group_by(day, Nomination.course_id)
+    return {
+        (day_of(row[0]), 'nominations', str(row[1])): row[2]
+        for row in db.session.execute(statement)
+    }
+
+
+def decision_counts(start, end):
+    day = func.date(ApprovalLog.timestamp)
+    statement = select(day, ApprovalLog.role, ApprovalLog.status, func.count()) \
+        .where(*day_range(ApprovalLog.timestamp, start, end)) \
+        .group_by(day, ApprovalLog.role, ApprovalLog.status)
+    return {
+        (day_of(row[0]), 'decisions', f"{row[1]}:{row[2]}"): row[3]
+        for row in db.session.execute(statement)
+    }
+
+
+def latency_counts(start, end):
+    import numpy as np
+    import pandas as pd
+
+    statement = select(ApprovalLog.timestamp, ApprovalLog.role, Nomination.submission_date) \
+        .join(Nomination, ApprovalLog.nomination_id == Nomination.id) \
+        .where(*day_range(ApprovalLog.timestamp, start, end))
+
+    totals = None
+    for partition in chunks(statement):
+        frame = pd.DataFrame.from_records(partition, columns=['timestamp', 'role', 'submission_date'])
+        frame['timestamp'] = pd.to_datetime(frame['timestamp'])
+        hours = (frame['timestamp'] - pd.to_datetime(frame['submission_date'])).dt.total_seconds() / 3600
+        frame, hours = frame[hours.notna()].copy(), hours[hours.notna()]
+        frame['bucket'] = np.searchsorted(LATENCY_BOUNDS, hours.clip(lower=0), side='left')
+        frame['day'] = frame['timestamp'].dt.date
+        counts = frame.groupby(['day', 'role', 'bucket']).size()
+        totals = counts if totals is None else totals.add(counts, fill_value=0)
+
+    if totals is None:
+        return {}
+    return {
+        (day, 'latency', f"{role}:{bucket}"): int(count)
+        for (day, role, bucket), count in totals.items()
+    }
+
+
+def collect(start, end):
+    """Counts for the days in [start, end), keyed by (day, metric, key)."""
+    counts = {}
+    counts.update(nomination_counts(start, end))
+    counts.update(decision_counts(start, end))
+    counts.update(latency_counts(start, end))
+    return counts
+
+
+def first_day():
+    first = db.session.execute(select(func.min(Nomination.submission_date))).scalar()
+    return first.date() if first else None
+
+
+def rolled_up_until():
+    last = db.session.execute(
+        select(func.max(AnalyticsRollup.day)).where(AnalyticsRollup.metric == ROLLED_UP)
+    ).scalar()
+    return last + timedelta(days=1) if last else first_day()
+
+
+def refresh_rollups(until=None):
+    """Roll up every finished day not yet stored, ANALYTICS_BATCH_DAYS per
+    transaction. Returns the number of days added."""
+    # Stored days are never revisited, so they are read from the primary
+    # rather than a replica that may not have the last rows of the day yet.
+    with primary():
+        until = until or datetime.utcnow().date()
+        start = rolled_up_until()
+        if start is None:
+            return 0
+
+        added = 0
+        while start < until:
+            end = min(start + timedelta(days=ANALYTICS_BATCH_DAYS), until)
+            rows = [
+                {'day': day, 'metric': metric, 'key': key, 'count': count}
+                for (day, metric, key), count in collect(start, end).items()
+            ]
+            rows += [
+                {'day': start + timedelta(days=offset), 'metric': ROLLED_UP, 'key': '', 'count': 1}
+                for offset in range((end - start).days)
+            ]
+            db.session.execute(AnalyticsRollup.__table__.insert(), rows)
+            try:
+                db.session.commit()
+            except IntegrityError:
+                # Another worker rolled up the same days first.
+                db.session.rollback()
+                return added
+            added += (end - start).days
+            start = end
+        return added
+
+
+def stored_counts(start, end):
+    statement = select(AnalyticsRollup.metric, AnalyticsRollup.key, func.sum(AnalyticsRollup.count)) \
+        .where(
+            AnalyticsRollup.metric != ROLLED_UP,
+            AnalyticsRollup.day >= start,
+            AnalyticsRollup.day < end
+        ) \
+        .group_by(AnalyticsRollup.metric, AnalyticsRollup.key)
+    return Counter({(row[0], row[1]): row[2] for row in db.session.execute(statement)})
+
+
+def median_hours(buckets):
+    total = sum(buckets.values())
+    if not total:
+        return None
+    seen = 0
+    for bucket in sorted(buckets):
+        count = buckets[bucket]
+        if seen + count >= total / 2:
+            lower = LATENCY_BOUNDS[bucket - 1] if bucket else 0
+            upper = LATENCY_BOUNDS[bucket] if bucket < len(LATENCY_BOUNDS) else lower
+            return lower + (upper - lower) * (total / 2 - seen) / count
+        seen += count
+
+
+def report(start=None, end=None):
+    """Figures for the days in [start, end]; both default to the whole
+    history up to today."""
+    today = datetime.utcnow().date()
+    refresh_rollups(today)
+    start = start or date.min
+    end = min(end or today, today) + timedelta(days=1)
+
+    counts = stored_counts(start, end)
+    if start <= today < end:
+        for (_, metric, key), count in collect(today, end).items():
+            counts[metric, key] += count
+
+    by_course = Counter()
+    decisions = defaultdict(Counter)
+    latency = defaultdict(Counter)
+    for (metric, key), count in counts.items():
+        if metric == 'nominations':
+            by_course[int(key)] += count
+        elif metric == 'decisions':
+            role, status = key.split(':', 1)
+            decisions[role][status] += count
+        elif metric == 'latency':
+            role, bucket = key.split(':', 1)
+            latency[role][int(bucket)] += count
+
+    courses = {
+        row.id: row
+        for row in db.session.execute(
+            select(TrainingCourse.id, TrainingCourse.course_title, TrainingCourse.region)
+        )
+    }
+
+    regions = defaultdict(lambda: {'courses': 0, 'nominations': 0})
+    for course in courses.values():
+        regions[course.region or '']['courses'] += 1
+    for course_id, count in by_course.items():
+        course = courses.get(course_id)
+        if course:
+            regions[course.region or '']['nominations'] += count
+
+    roles = []
+    for role in sorted(set(decisions) | set(latency)):
+        total = sum(decisions[role].values())
+        rejected = decisions[role]['rejected']
+        roles.append({
+            'role': role,
+            'total': total,
+            'approved': total - rejected,
+            'rejected': rejected,
+            'approval_rate': (total - rejected) / total if total else None,
+            'rejection_rate': rejected / total if total else None,
+            'median_hours': median_hours(latency[role]),
+        })
+
+    return {
+        'start': None if start == date.min else start,
+        'end': end - timedelta(days=1),
+        'courses': [
+            {'id': course_id, 'course_title': courses[course_id].course_title,
+             'region': courses[course_id].region, 'nominations': count}
+            for course_id, count in by_course.most_common()
+            if course_id in courses
+        ],
+        'roles': roles,
+        'regions': sorted(
+            (
+                dict(values, region=region,
+                     per_course=values['nominations'] / values['courses'] if values['courses'] else None)
+                for region, values in regions.items()
+            ),
+            key=lambda row: row['nominations'],
+            reverse=True
+        ),
+    }
+
+
+if __name__ == '__main__':
+    import sys
+    from app import create_app
+
+    with create_app().app_context():
+        if sys.argv[1:] == ['rollup']:
+            print("rolled up", refresh_rollups(), "days")
+        else:
+            print("usage: python analytics.py rollup")
@@ -0,0 +1,110 @@
+"""Moves finished nominations, with their approval logs, out of the live
+tables into nominations_archive and approval_logs_archive:
+
+    python archive.py --older-than-days 365
+
+A nomination is finished once it is rejected or submitted to the institute,
+and is moved ARCHIVE_AFTER_DAYS after its last decision. Each batch of
+ARCHIVE_BATCH_SIZE nominations is moved in its own transaction, so the run
+can be stopped at any point and resumed by running it again. The JSON API
+reads the archive alongside the live tables with include_archived=1.
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timedelta
+from sqlalchemy import delete, func, insert, literal, select
+from models import db, Nomination, ApprovalLog, NominationRead, ArchivedNomination, ArchivedApprovalLog
+from dashboard_cache import invalidate, queue_scope, nominations_scope
+from notifications import QUEUE_STATES, bump, employee_scope
+
+
+ARCHIVE_AFTER_DAYS = int(os.getenv("ARCHIVE_AFTER_DAYS", 365))
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", 500))
+ARCHIVE_PAUSE_SECONDS = float(os.getenv("ARCHIVE_PAUSE_SECONDS", 0.5))
+
+ARCHIVE_STATES = ['rejected', 'submitted', 'final_submitted']
+
+NOMINATION_COLUMNS = [column.name for column in Nomination.__table__.columns]
+LOG_COLUMNS = [column.name for column in ApprovalLog.__table__.columns]
+
+
+def copy_rows(target, source, columns, *criteria, **extra):
+    values = [source.__table__.c[name] for name in columns]
+    values += [literal(value, target.__table__.c[name].type) for name, value in extra.items()]
+    db.session.execute(
+        insert(target).from_select(columns + list(extra), select(*values).where(*criteria))
+    )
+
+
+def archive_batch(cutoff, batch_size=ARCHIVE_BATCH_SIZE):
+    """Moves up to batch_size nominations last decided before cutoff and
+    returns how many were moved."""
+    ids = db.session.execute(
+        select(Nomination.id)
+        .where(Nomination.final_status.in_(ARCHIVE_STATES), Nomination.last_decided_at < cutoff)
+        .order_by(Nomination.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        return 0
+
+    # Unread decision logs leave the employees' badges along with the rows.
+    unread = db.session.execute(
+        select(Nomination.user_id, func.count(ApprovalLog.id))
+        .join(ApprovalLog, ApprovalLog.nomination_id == Nomination.id)
+        .where(Nomination.id.in_(ids), ApprovalLog.is_read == False)
+        .group_by(Nomination.user_id)
+    ).all()
+    user_ids = db.session.execute(
+        select(Nomination.user_id).where(Nomination.id.in_(ids)).distinct()
+    ).scalars().all()
+
+    copy_rows(ArchivedNomination, Nomination, NOMINATION_COLUMNS, Nomination.id.in_(ids),
+              archived_at=datetime.utcnow())
+    copy_rows(ArchivedApprovalLog, ApprovalLog, LOG_COLUMNS, ApprovalLog.nomination_id.in_(ids))
+    for user_id, count in unread:
+        bump(employee_scope(user_id), -count)
+
+    db.session.execute(delete(NominationRead).where(NominationRead.nomination_id.in_(ids)))
+    db.session.execute(delete(ApprovalLog).where(ApprovalLog.nomination_id.in_(ids)))
+    db.session.execute(delete(Nomination).where(Nomination.id.in_(ids)))
+    db.session.commit()
+
+    invalidate(*(queue_scope(role) for role in QUEUE_STATES), *(nominations_scope(u) for u in user_ids))
+    return len(ids)
+
+
+def run(older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    from analytics import refresh_rollups
+
+    # Reports count from the live tables, so every finished day is rolled up
+    # before its rows can leave them.
+    refresh_rollups()
+
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    moved = batches = 0
+    while max_batches is None or batches < max_batches:
+        count = archive_batch(cutoff, batch_size)
+        if not count:
+            break
+        moved += count
+        batches += 1
+        if count < batch_size:
+            break
+        time.sleep(ARCHIVE_PAUSE_SECONDS)
+    return moved
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Archive finished nominations and their approval logs.")
+    parser.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS)
+    parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    parser.add_argument('--max-batches', type=int)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        print("archived", run(args.older_than_days, args.batch_size, args.max_batches), "nominations")
@@ -0,0 +1,161 @@
+"""Login, password hashing and the signed-in user.
+
+The user's profile columns are cached per worker, keyed by a generation
+that every profile update bumps (see generations.py), so the dashboards and
+forms stop reloading the same row on every request. Edits are rare, so one
+generation covers all users and a worker re-reads it at most every
+CACHE_GENERATION_SECONDS. Password hashes are produced with
+PASSWORD_HASH_METHOD and upgraded to it on the next successful login. Failed
+login attempts are rate limited per address and per job number; a token is
+taken before any hash is checked and given back when the login succeeds.
+"""
+import os
+import threading
+import time
+from functools import lru_cache
+from flask import session
+from sqlalchemy import update
+from sqlalchemy.orm import make_transient_to_detached
+from werkzeug.security import check_password_hash, generate_password_hash
+from cache import LRUCache
+from database import primary
+from generations import generations
+from models import db, User
+
+
+# Any werkzeug method string, e.g. "scrypt:32768:8:1" or "pbkdf2:sha256:600000".
+PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+
+AUTH_USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", 1024))
+AUTH_USER_CACHE_TTL = int(os.getenv("AUTH_USER_CACHE_TTL", 300))
+
+LOGIN_RATE_PER_MINUTE = float(os.getenv("LOGIN_RATE_PER_MINUTE", 10))
+LOGIN_BURST = int(os.getenv("LOGIN_BURST", 5))
+LOGIN_BUCKETS = int(os.getenv("LOGIN_BUCKETS", 10000))
+
+# The hash is left out so it never sits in the cache; it is only read at login.
+PROFILE_COLUMNS = [column.key for column in User.__table__.columns if column.key != 'password_hash']
+
+USERS_GENERATION_KEY = 'auth:users'
+
+local_cache = LRUCache(max_entries=AUTH_USER_CACHE_SIZE, ttl=AUTH_USER_CACHE_TTL)
+
+
+def hash_password(password):
+    return generate_password_hash(password, method=PASSWORD_HASH_METHOD)
+
+
+@lru_cache(maxsize=None)
+def current_method():
+    # generate_password_hash fills in the defaults ("scrypt" becomes
+    # "scrypt:32768:8:1"), so the prefix of a fresh hash is what stored ones
+    # are compared with.
+    return hash_password('').split('$', 1)[0]
+
+
+@lru_cache(maxsize=None)
+def dummy_hash():
+    return hash_password(os.urandom(16).hex())
+
+
+def needs_rehash(password_hash):
+    return password_hash.split('$', 1)[0] != current_method()
+
+
+def authenticate(job_number, password):
+    user = User.query.filter_by(job_number=job_number).first()
+    if user is None:
+        # Spend the same time as a wrong password, so unknown job numbers
+        # cannot be told apart by how quickly they fail.
+        check_password_hash(dummy_hash(), password)
+        return None
+    if not check_password_hash(user.password_hash, password):
+        return None
+
+    if needs_rehash(user.password_hash):
+        db.session.execute(
+            update(User)
+            .where(User.id == user.id, User.password_hash == user.password_hash)
+            .values(password_hash=hash_password(password))
+        )
+        db.session.commit()
+    return user
+
+
+def user_generation(user_id):
+    return generations.get(USERS_GENERATION_KEY)
+
+
+def invalidate_user(user_id):
+    generations.bump(USERS_GENERATION_KEY)
+
+
+def current_user():
+    user_id = session.get('user_id')
+    if not user_id:
+        return None
+
+    key = (user_id, user_generation(user_id))
+    profile = local_cache.get(key)
+    if profile is None:
+        with primary():
+            user = db.session.get(User, user_id)
+        if user is not None:
+            local_cache.set(key, {column: getattr(user, column) for column in PROFILE_COLUMNS})
+        return user
+
+    # Rebuilt as a detached row and merged without a SELECT; the hash and
+    # any relationship still load on first access.
+    user = User(**profile)
+    make_transient_to_detached(user)
+    return db.session.merge(user, load=False)
+
+
+class TokenBucket:
+    """Per-key token buckets holding up to `burst` tokens, refilled at `rate`
+    tokens per second. Buckets live in a per-worker LRU; one that expired or
+    was evicted would have refilled anyway."""
+
+    def __init__(self, rate, burst, max_keys=10000):
+        self.rate = rate
+        self.burst = burst
+        self._buckets = LRUCache(max_entries=max_keys, ttl=burst / rate)
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Takes a token; returns 0 on success, otherwise the seconds until
+        the next token is available."""
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets.set(key, (tokens, now))
+                return (1 - tokens) / self.rate
+            self._buckets.set(key, (tokens - 1, now))
+            return 0
+
+    def give(self, key):
+        with self._lock:
+            now = time.monotonic()
+            tokens, updated = self._buckets.get(key, (self.burst, now))
+            self._buckets.set(key, (min(self.burst, tokens + (now - updated) * self.rate + 1), now))
+
+
+# LOGIN_RATE_PER_MINUTE=0 turns the limit off, e.g. for load tests.
+login_limiter = TokenBucket(LOGIN_RATE_PER_MINUTE / 60, LOGIN_BURST, LOGIN_BUCKETS) \
+    if LOGIN_RATE_PER_MINUTE else None
+
+
+def login_retry_after(remote_addr, job_number):
+    """Seconds the caller has to wait before trying to log in again, or 0."""
+    if login_limiter is None:
+        return 0
+    return login_limiter.take(f'ip:{remote_addr}') or login_limiter.take(f'job:{job_number}')
+
+
+def login_succeeded(remote_addr, job_number):
+    # Only failed attempts count against the limit.
+    if login_limiter is not None:
+        login_limiter.give(f'ip:{remote_addr}')
+        login_limiter.give(f'job:{job_number}')
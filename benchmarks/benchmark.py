@@ -0,0 +1,442 @@
+"""Load and latency benchmark for the nomination workflow.
+
+    python benchmarks/benchmark.py seed --employees 2000 --courses 300 --nominations 10000
+    python benchmarks/benchmark.py run --requests 200
+    python benchmarks/benchmark.py run --driver http --gunicorn-workers 4 --concurrency 16
+    python benchmarks/benchmark.py run --save-baseline benchmarks/baselines/sqlite.json
+    python benchmarks/benchmark.py run --compare benchmarks/baselines/sqlite.json
+
+The database is a SQLite file in the temp directory unless --database-url
+names another; DATABASE_URL is never read, since seeding drops every table.
+A server database such as Postgres also needs --allow-server-database:
+
+    python benchmarks/benchmark.py --database-url postgresql://localhost/bader_bench --allow-server-database seed
+
+A comparison run exits with status 1 when a scenario is slower, slower to
+serve, or issues more SQL statements than its baseline allows.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'bader_bench.db')
+PASSWORD = 'bench-password'
+APPROVERS = ['admin', 'hr', 'entry']
+
+# name -> (role, method, path, payload kind)
+SCENARIOS = {
+    'login': ('employee', 'POST', '/login', 'login'),
+    'dashboard_admin': ('admin', 'GET', '/dashboard', None),
+    'dashboard_hr': ('hr', 'GET', '/dashboard', None),
+    'dashboard_entry': ('entry', 'GET', '/dashboard', None),
+    'dashboard_employee': ('employee', 'GET', '/dashboard', None),
+    'dashboard_hr_page': ('hr', 'GET', '/dashboard-hr', None),
+    'dashboard_entry_page': ('entry', 'GET', '/dashboard_entry', None),
+    'new_nomination': ('employee', 'POST', '/new_nomination', 'course'),
+    'admin_decide': ('admin', 'POST', '/admin_decide', 'admin'),
+    'hr_decide': ('hr', 'POST', '/hr_decide', 'hr'),
+    'entry_decide': ('entry', 'POST', '/entry_decide', 'entry'),
+}
+
+# Nomination states seeded in equal shares, with the logs each state implies.
+STATES = [
+    ('pending', 'draft', []),
+    ('approved', 'draft', [('admin', 'approved')]),
+    ('approved', 'approved', [('admin', 'approved'), ('hr', 'approved')]),
+    ('approved', 'submitted', [('admin', 'approved'), ('hr', 'approved'), ('entry', 'submitted')]),
+    ('rejected', 'rejected', [('admin', 'rejected')]),
+]
+
+
+def load_app(database_url):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('LOGIN_RATE_PER_MINUTE', '0')
+    # Measure rendering, not cache hits; set it to benchmark the cache.
+    os.environ.setdefault('DASHBOARD_CACHE_SIZE', '0')
+    from app import create_app
+    return create_app()
+
+
+def seed(args):
+    app = load_app(args.database_url)
+    from sqlalchemy import insert
+    from werkzeug.security import generate_password_hash
+    from models import db, User, TrainingCourse, Nomination, ApprovalLog
+    from migrations import upgrade, backfill_last_log
+    from seats import recount_seats
+
+    rng = random.Random(args.seed)
+    password_hash = generate_password_hash(PASSWORD)
+    now = datetime.utcnow()
+
+    with app.app_context():
+        db.drop_all()
+        upgrade()
+
+        users = [
+            {
+                'full_name': f'{role} bench', 'national_id': f'{role}-bench', 'email': f'{role}@bench',
+                'job_number': f'{role}-bench', 'role': role, 'password_hash': password_hash, 'created_at': now,
+            }
+            for role in APPROVERS
+        ]
+        users += [
+            {
+                'full_name': f'موظف {i}', 'national_id': f'n{i}', 'email': f'e{i}@bench',
+                'job_number': f'e{i}', 'role': 'employee', 'password_hash': password_hash, 'created_at': now,
+            }
+            for i in range(args.employees)
+        ]
+        db.session.execute(insert(User), users)
+
+        db.session.execute(insert(TrainingCourse), [
+            {
+                'course_title': f'دورة تدريبية {i}', 'region': rng.choice(['الرياض', 'مكة', 'الشرقية']),
+                'delivery_mode': rng.choice(['حضوري', 'عن بعد']),
+                'start_date': date(2026, 1, 1) + timedelta(days=rng.randrange(365)),
+                'duration_days': rng.randint(1, 10), 'created_at': now,
+            }
+            for i in range(args.courses)
+        ])
+        db.session.commit()
+
+        approver_ids = {u.role: u.id for u in User.query.filter(User.role.in_(APPROVERS))}
+        employee_ids = [row.id for row in db.session.query(User.id).filter_by(role='employee')]
+        course_ids = [row.id for row in db.session.query(TrainingCourse.id)]
+
+        pairs = set()
+        limit = min(args.nominations, len(employee_ids) * len(course_ids))
+        while len(pairs) < limit:
+            pairs.add((rng.choice(employee_ids), rng.choice(course_ids)))
+
+        nominations = []
+        for i, (user_id, course_id) in enumerate(sorted(pairs)):
+            status, final_status, _ = STATES[i % len(STATES)]
+            nominations.append({
+                'user_id': user_id, 'course_id': course_id, 'status': status,
+                'final_status': final_status, 'is_read': False,
+                'submission_date': now - timedelta(minutes=rng.randrange(60 * 24 * 365)),
+            })
+        for start in range(0, len(nominations), 5000):
+            db.session.execute(insert(Nomination), nominations[start:start + 5000])
+        db.session.commit()
+
+        logs = []
+        for nomination in db.session.query(Nomination.id, Nomination.status, Nomination.final_status,
+                                           Nomination.submission_date):
+            trail = next(t for s, f, t in STATES if (s, f) == (nomination.status, nomination.final_status))
+            for step, (role, status) in enumerate(trail, start=1):
+                logs.append({
+                    'nomination_id': nomination.id, 'approved_by': approver_ids[role], 'role': role,
+                    'status': status, 'notes': 'bench', 'is_read': False,
+                    'timestamp': nomination.submission_date + timedelta(hours=step),
+                })
+        for start in range(0, len(logs), 5000):
+            db.session.execute(insert(ApprovalLog), logs[start:start + 5000])
+        db.session.commit()
+        with db.engine.begin() as conn:
+            backfill_last_log(conn)
+            recount_seats(conn)
+
+    print(f"seeded {len(users)} users, {len(course_ids)} courses, "
+          f"{len(nominations)} nominations, {len(logs)} approval logs into {args.database_url}")
+
+
+class Workload:
+    """Ids the write scenarios consume; each decision targets a fresh row."""
+
+    def __init__(self, app):
+        from models import db, User, TrainingCourse, Nomination
+
+        with app.app_context():
+            self.users = {u.role: u.job_number for u in User.query.filter(User.role.in_(APPROVERS))}
+            self.employees = [row.job_number for row in db.session.query(User.job_number).filter_by(role='employee').limit(200)]
+            self.courses = [row.id for row in db.session.query(TrainingCourse.id)]
+            self.queues = {
+                role: [row.id for row in db.session.query(Nomination.id).filter_by(status=s, final_status=f)]
+                for role, (s, f) in {'admin': ('pending', 'draft'), 'hr': ('approved', 'draft'),
+                                     'entry': ('approved', 'approved')}.items()
+            }
+            db.session.remove()
+        for ids in self.queues.values():
+            random.shuffle(ids)
+        self.lock = threading.Lock()
+
+    def job_number(self, role):
+        return random.choice(self.employees) if role == 'employee' else self.users[role]
+
+    def payload(self, kind, role):
+        if kind is None:
+            return None
+        if kind == 'login':
+            return {'job_number': self.job_number(role), 'password': PASSWORD}
+        if kind == 'course':
+            return {'course_id': random.choice(self.courses)}
+        with self.lock:
+            if not self.queues[kind]:
+                return False
+            nomination_id = self.queues[kind].pop()
+        if kind == 'admin':
+            return {'nomination_id': nomination_id, 'action': 'approve'}
+        if kind == 'hr':
+            return {'nomination_id': nomination_id, 'decision': 'approve'}
+        return {'nomination_id': nomination_id}
+
+
+def summarize(latencies, elapsed, statements):
+    latencies = sorted(latencies)
+    if not latencies:
+        return None
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'requests': len(latencies),
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'rps': round(len(latencies) / elapsed, 2) if elapsed else None,
+        'queries_per_request': round(statements / len(latencies), 2) if statements is not None else None,
+    }
+
+
+def run_test_client(app, workload, scenarios, args):
+    from sqlalchemy import event
+    from models import db
+
+    counter = {'statements': 0}
+
+    def count(*_):
+        counter['statements'] += 1
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', count)
+
+    clients = {}
+    for role in {SCENARIOS[name][0] for name in scenarios}:
+        client = app.test_client()
+        client.post('/login', data={'job_number': workload.job_number(role), 'password': PASSWORD})
+        clients[role] = client
+
+    results = {}
+    for name in scenarios:
+        role, method, path, kind = SCENARIOS[name]
+        client = app.test_client() if name == 'login' else clients[role]
+        latencies = []
+        counter['statements'] = 0
+        started = time.perf_counter()
+        for _ in range(args.requests):
+            data = workload.payload(kind, role)
+            if data is False:
+                break
+            t0 = time.perf_counter()
+            response = client.open(path, method=method, data=data)
+            latencies.append(time.perf_counter() - t0)
+            if response.status_code >= 500:
+                raise RuntimeError(f"{name}: {method} {path} returned {response.status_code}")
+        results[name] = summarize(latencies, time.perf_counter() - started, counter['statements'])
+    return results
+
+
+def scrape_statements(base_url):
+    import requests
+
+    totals = {}
+    token = os.getenv('METRICS_TOKEN')
+    headers = {'Authorization': f'Bearer {token}'} if token else {}
+    text = requests.get(base_url + '/metrics', headers=headers, timeout=10).text
+    for line in text.splitlines():
+        match = re.match(r'bader_request_sql_statements_(sum|count)\{endpoint="([^"]+)",method="([^"]+)"\} (\S+)', line)
+        if match:
+            kind, endpoint, method, value = match.groups()
+            totals.setdefault((endpoint, method), {})[kind] = float(value)
+    return totals
+
+
+def run_http(app, base_url, workload, scenarios, args):
+    import requests
+
+    results = {}
+    for name in scenarios:
+        role, method, path, kind = SCENARIOS[name]
+        endpoint = app.url_map.bind('localhost').match(path, method)[0]
+        sessions = threading.local()
+
+        def one_request(_):
+            if name != 'login' and not hasattr(sessions, 'http'):
+                sessions.http = requests.Session()
+                sessions.http.post(base_url + '/login', allow_redirects=False,
+                                   data={'job_number': workload.job_number(role), 'password': PASSWORD})
+            http = requests.Session() if name == 'login' else sessions.http
+            data = workload.payload(kind, role)
+            if data is False:
+                return None
+            t0 = time.perf_counter()
+            response = http.request(method, base_url + path, data=data, allow_redirects=False)
+            elapsed = time.perf_counter() - t0
+            if response.status_code >= 500:
+                raise RuntimeError(f"{name}: {method} {path} returned {response.status_code}")
+            return elapsed
+
+        before = scrape_statements(base_url)
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = [t for t in pool.map(one_request, range(args.requests)) if t is not None]
+        elapsed = time.perf_counter() - started
+        after = scrape_statements(base_url)
+
+        # /metrics is per worker process, so query counts are exact only
+        # with a single gunicorn worker.
+        statements = None
+        if args.gunicorn_workers == 1:
+            key = (endpoint, method)
+            statements = after.get(key, {}).get('sum', 0) - before.get(key, {}).get('sum', 0)
+        results[name] = summarize(latencies, elapsed, statements)
+    return results
+
+
+def start_gunicorn(args):
+    env = dict(os.environ, DATABASE_URL=args.database_url, SLOW_REQUEST_MS='1000000')
+    env.setdefault('LOGIN_RATE_PER_MINUTE', '0')
+    env.setdefault('DASHBOARD_CACHE_SIZE', '0')
+    bind = f'127.0.0.1:{args.port}'
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-w', str(args.gunicorn_workers), '-b', bind, 'app:app'],
+        cwd=ROOT, env=env
+    )
+    import requests
+
+    for _ in range(100):
+        try:
+            requests.get(f'http://{bind}/login', timeout=1)
+            return process, f'http://{bind}'
+        except requests.ConnectionError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError("gunicorn did not start")
+
+
+def compare(results, baseline, driver, tolerance):
+    if baseline['driver'] != driver:
+        return [f"baseline was recorded with the {baseline['driver']} driver, not {driver}"]
+    failures = []
+    for name, base in baseline['results'].items():
+        current = results.get(name)
+        if not current or not base:
+            continue
+        if current['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+            failures.append(f"{name}: p95 {current['p95_ms']} ms > baseline {base['p95_ms']} ms")
+        if base.get('rps') and current.get('rps') and current['rps'] < base['rps'] * (1 - tolerance):
+            failures.append(f"{name}: {current['rps']} req/s < baseline {base['rps']} req/s")
+        if (base.get('queries_per_request') is not None and current.get('queries_per_request') is not None
+                and current['queries_per_request'] > base['queries_per_request']):
+            failures.append(f"{name}: {current['queries_per_request']} queries/request "
+                            f"> baseline {base['queries_per_request']}")
+    return failures
+
+
+def print_table(results):
+    print(f"{'scenario':<22}{'reqs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'q/req':>8}")
+    for name, r in results.items():
+        if r is None:
+            print(f"{name:<22}{'—':>6}")
+            continue
+        queries = '—' if r['queries_per_request'] is None else r['queries_per_request']
+        print(f"{name:<22}{r['requests']:>6}{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}"
+              f"{r['rps'] or '—':>10}{queries:>8}")
+
+
+def run(args):
+    app = load_app(args.database_url)
+    workload = Workload(app)
+    scenarios = args.scenarios or list(SCENARIOS)
+
+    if args.driver == 'http':
+        process = None
+        base_url = args.url
+        if not base_url:
+            process, base_url = start_gunicorn(args)
+        try:
+            results = run_http(app, base_url, workload, scenarios, args)
+        finally:
+            if process:
+                process.terminate()
+                process.wait()
+    else:
+        results = run_test_client(app, workload, scenarios, args)
+
+    print_table(results)
+    report = {
+        'driver': args.driver,
+        'database': args.database_url.split(':', 1)[0],
+        'requests': args.requests,
+        'created_at': datetime.utcnow().isoformat(),
+        'results': results,
+    }
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as fh:
+            json.dump(report, fh, indent=2, ensure_ascii=False)
+        print("baseline saved to", args.save_baseline)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            failures = compare(results, json.load(fh), args.driver, args.tolerance)
+        if failures:
+            print("regressions against", args.compare)
+            for failure in failures:
+                print("  " + failure)
+            return 1
+        print("no regressions against", args.compare)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    parser.add_argument('--allow-server-database', action='store_true',
+                        help='allow a non-SQLite --database-url, whose tables seed drops')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    seed_parser = commands.add_parser('seed', help='recreate and fill the benchmark database')
+    seed_parser.add_argument('--employees', type=int, default=1000)
+    seed_parser.add_argument('--courses', type=int, default=200)
+    seed_parser.add_argument('--nominations', type=int, default=5000)
+    seed_parser.add_argument('--seed', type=int, default=1)
+
+    run_parser = commands.add_parser('run', help='drive the scenarios and report latency')
+    run_parser.add_argument('--driver', choices=['client', 'http'], default='client')
+    run_parser.add_argument('--requests', type=int, default=100, help='requests per scenario')
+    run_parser.add_argument('--concurrency', type=int, default=8, help='http driver threads')
+    run_parser.add_argument('--url', help='existing server for the http driver')
+    run_parser.add_argument('--gunicorn-workers', type=int, default=1)
+    run_parser.add_argument('--port', type=int, default=8765)
+    run_parser.add_argument('--scenarios', nargs='*', choices=list(SCENARIOS))
+    run_parser.add_argument('--save-baseline')
+    run_parser.add_argument('--compare')
+    run_parser.add_argument('--tolerance', type=float, default=0.25)
+
+    args = parser.parse_args(argv)
+    if not args.database_url.startswith('sqlite') and not args.allow_server_database:
+        parser.error("--database-url is not SQLite; its tables are dropped and refilled, "
+                     "so pass --allow-server-database to use it anyway")
+    if args.command == 'seed':
+        seed(args)
+        return 0
+    return run(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
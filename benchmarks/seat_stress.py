@@ -0,0 +1,192 @@
+"""Concurrency stress test for seat reservations: many approvers decide on
+nominations for a few small courses at once, then every course is checked
+for overbooking and for counts that drifted from the nominations.
+
+    python benchmarks/seat_stress.py --threads 16 --decisions 2000
+    python benchmarks/seat_stress.py --database-url postgresql://localhost/bader_stress --allow-server-database
+
+Each thread makes its own decisions in its own session, as a gunicorn
+worker would: single and bulk approvals by the direct manager, rejections
+by HR and the entry clerk, and final approvals. Exits with status 1 when a
+course has more seats taken than its capacity, or when its held/confirmed
+counts differ from the nominations in those states.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'bader_seats.db')
+
+# (role, action, how many nominations per decision)
+DECISIONS = [
+    ('admin', 'approve', 1),
+    ('admin', 'approve', 1),
+    ('admin', 'approve', 5),
+    ('hr', 'reject', 1),
+    ('hr', 'approve', 1),
+    ('entry', 'approve', 1),
+    ('entry', 'reject', 1),
+]
+QUEUES = {
+    'admin': {'status': 'pending', 'final_status': 'draft'},
+    'hr': {'status': 'approved', 'final_status': 'draft'},
+    'entry': {'status': 'approved', 'final_status': 'approved'},
+}
+
+
+def load_app(database_url, threads):
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.setdefault('DB_POOL_SIZE', str(threads))
+    # Waiting on a contended row is the point here, not a slow query to report.
+    os.environ.setdefault('SLOW_QUERY_MS', '1000000')
+    from app import create_app
+    return create_app()
+
+
+def seed(app, args):
+    from sqlalchemy import insert
+    from models import db, User, TrainingCourse, Nomination
+    from migrations import upgrade
+
+    now = datetime.utcnow()
+    with app.app_context():
+        db.drop_all()
+        upgrade()
+        db.session.execute(insert(User), [
+            {'full_name': f'{role} stress', 'national_id': f'{role}-stress', 'email': f'{role}@stress',
+             'job_number': f'{role}-stress', 'role': role, 'password_hash': '-', 'created_at': now}
+            for role in ['admin', 'hr', 'entry']
+        ] + [
+            {'full_name': f'موظف {i}', 'national_id': f's{i}', 'email': f's{i}@stress',
+             'job_number': f's{i}', 'role': 'employee', 'password_hash': '-', 'created_at': now}
+            for i in range(args.nominations)
+        ])
+        db.session.execute(insert(TrainingCourse), [
+            {'course_title': f'دورة {i}', 'duration_days': 1, 'capacity': args.capacity, 'created_at': now}
+            for i in range(args.courses)
+        ])
+        db.session.commit()
+
+        approvers = {u.role: u.id for u in User.query.filter(User.role != 'employee')}
+        employees = [u.id for u in User.query.filter_by(role='employee').order_by(User.id)]
+        courses = [c.id for c in TrainingCourse.query.order_by(TrainingCourse.id)]
+        db.session.execute(insert(Nomination), [
+            {'user_id': user_id, 'course_id': courses[i % len(courses)], 'status': 'pending',
+             'final_status': 'draft', 'is_read': False, 'submission_date': now}
+            for i, user_id in enumerate(employees)
+        ])
+        db.session.commit()
+        return approvers
+
+
+def worker(app, approvers, decisions, results, rng):
+    """Makes `decisions` decisions and adds how each nomination came out to
+    its own Counter in results."""
+    from sqlalchemy import select
+    from sqlalchemy.exc import OperationalError
+    from models import db, Nomination
+    from decisions import decide_many
+
+    tally = results[threading.current_thread().name] = Counter()
+
+    with app.app_context():
+        for _ in range(decisions):
+            role, action, size = rng.choice(DECISIONS)
+            queue = QUEUES[role]
+            ids = db.session.execute(
+                select(Nomination.id)
+                .where(Nomination.status == queue['status'], Nomination.final_status == queue['final_status'])
+                .limit(50)
+            ).scalars().all()
+            db.session.rollback()
+            if not ids:
+                continue
+            try:
+                outcome = decide_many(role, action, rng.sample(ids, min(size, len(ids))), approvers[role])
+            except OperationalError:
+                # SQLite gives up on a write lock it waited too long for.
+                db.session.rollback()
+                tally['busy'] += 1
+                continue
+            tally.update(outcome.values())
+
+
+def check(app):
+    from sqlalchemy import func, select
+    from models import db, TrainingCourse, Nomination
+    from seats import HELD_STATES, CONFIRMED_STATES, in_states
+
+    def counts(states):
+        return dict(db.session.execute(
+            select(Nomination.course_id, func.count()).where(in_states(states)).group_by(Nomination.course_id)
+        ).all())
+
+    failures = []
+    with app.app_context():
+        held, confirmed = counts(HELD_STATES), counts(CONFIRMED_STATES)
+        for course in TrainingCourse.query.order_by(TrainingCourse.id):
+            taken = held.get(course.id, 0) + confirmed.get(course.id, 0)
+            print(f"course {course.id}: capacity {course.capacity}, held {course.seats_held}, "
+                  f"confirmed {course.seats_confirmed}, nominations holding a seat {taken}")
+            if taken > course.capacity:
+                failures.append(f"course {course.id} is overbooked: {taken} > {course.capacity}")
+            if (course.seats_held, course.seats_confirmed) != (held.get(course.id, 0), confirmed.get(course.id, 0)):
+                failures.append(f"course {course.id} counts drifted from its nominations")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url', default=DEFAULT_DATABASE_URL)
+    parser.add_argument('--allow-server-database', action='store_true',
+                        help='allow a non-SQLite --database-url, whose tables are dropped')
+    parser.add_argument('--threads', type=int, default=16)
+    parser.add_argument('--decisions', type=int, default=1000, help='decisions across all threads')
+    parser.add_argument('--courses', type=int, default=4)
+    parser.add_argument('--capacity', type=int, default=10)
+    parser.add_argument('--nominations', type=int, default=400)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+    if not args.database_url.startswith('sqlite') and not args.allow_server_database:
+        parser.error("--database-url is not SQLite; its tables are dropped and refilled, "
+                     "so pass --allow-server-database to use it anyway")
+
+    app = load_app(args.database_url, args.threads)
+    approvers = seed(app, args)
+
+    results = {}
+    threads = [
+        threading.Thread(target=worker, args=(
+            app, approvers, args.decisions // args.threads, results, random.Random(args.seed + i)
+        ))
+        for i in range(args.threads)
+    ]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    totals = sum(results.values(), Counter())
+    print(f"{args.threads} threads, {elapsed:.1f}s: " +
+          ', '.join(f"{result} {count}" for result, count in sorted(totals.items())))
+    failures = check(app)
+    for failure in failures:
+        print("FAIL", failure)
+    if not failures:
+        print("no overbooking")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,139 @@
+"""Startup-time benchmark: how long a fresh interpreter takes to import the
+app, build it with create_app() and serve its first request, which is what a
+gunicorn worker or a test run pays before doing any work.
+
+    python benchmarks/startup.py --runs 10
+    python benchmarks/startup.py --save-baseline benchmarks/baselines/startup.json
+    python benchmarks/startup.py --compare benchmarks/baselines/startup.json
+
+Each run is a new process, so nothing is shared between samples. The run
+also fails when one of HEAVY_MODULES is loaded by the time the first request
+has been served; those belong to the views that use them.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_DATABASE_URL = 'sqlite:///' + os.path.join(tempfile.gettempdir(), 'bader_startup.db')
+HEAVY_MODULES = ['pandas', 'numpy', 'openpyxl', 'requests', 'firebase_admin']
+PHASES = ['import', 'create_app', 'first_request', 'total']
+
+# Runs in the child interpreter; prints one JSON line with its timings.
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app as module
+imported = time.perf_counter()
+app = module.create_app()
+created = time.perf_counter()
+app.test_client().get('/login')
+served = time.perf_counter()
+print(json.dumps({
+    'import': imported - started,
+    'create_app': created - imported,
+    'first_request': served - created,
+    'total': served - started,
+    'heavy': [name for name in %r if name in sys.modules],
+}))
+""" % (HEAVY_MODULES,)
+
+
+def sample(database_url):
+    env = dict(os.environ, DATABASE_URL=database_url)
+    output = subprocess.run(
+        [sys.executable, '-c', PROBE], cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(database_url, top):
+    # -X importtime reports cumulative microseconds per module on stderr.
+    env = dict(os.environ, DATABASE_URL=database_url)
+    stderr = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import app; app.create_app()'],
+        cwd=ROOT, env=env, check=True, capture_output=True, text=True
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def measure(database_url, runs):
+    samples = [sample(database_url) for _ in range(runs)]
+    results = {
+        phase: round(statistics.median(s[phase] for s in samples) * 1000, 1)
+        for phase in PHASES
+    }
+    heavy = sorted({name for s in samples for name in s['heavy']})
+    return results, heavy
+
+
+def compare(results, baseline, tolerance):
+    failures = []
+    for phase in PHASES:
+        base = baseline['results'].get(phase)
+        if base is not None and results[phase] > base * (1 + tolerance):
+            failures.append(f"{phase}: {results[phase]} ms > baseline {base} ms (+{tolerance:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL', DEFAULT_DATABASE_URL))
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--imports', type=int, default=0, help='also list the N slowest imports')
+    parser.add_argument('--save-baseline')
+    parser.add_argument('--compare')
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    results, heavy = measure(args.database_url, args.runs)
+    for phase in PHASES:
+        print(f"{phase:<16}{results[phase]:>10} ms")
+
+    if args.imports:
+        print("slowest imports (cumulative):")
+        for cumulative, name in slowest_imports(args.database_url, args.imports):
+            print(f"  {cumulative / 1000:>8.1f} ms  {name}")
+
+    status = 0
+    if heavy:
+        print("loaded at startup:", ', '.join(heavy))
+        status = 1
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w') as fh:
+            json.dump({
+                'runs': args.runs,
+                'created_at': datetime.utcnow().isoformat(),
+                'results': results,
+            }, fh, indent=2)
+        print("baseline saved to", args.save_baseline)
+
+    if args.compare:
+        with open(args.compare) as fh:
+            failures = compare(results, json.load(fh), args.tolerance)
+        if failures:
+            print("regressions against", args.compare)
+            for failure in failures:
+                print("  " + failure)
+            status = 1
+        else:
+            print("no regressions against", args.compare)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
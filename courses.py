@@ -0,0 +1,46 @@
+import os
+from cache import LRUCache
+from database import primary
+from generations import generations
+from models import TrainingCourse
+
+
+COURSE_CACHE_TTL = int(os.getenv("COURSE_CACHE_TTL", 300))
+COURSE_CACHE_SIZE = int(os.getenv("COURSE_CACHE_SIZE", 8))
+
+GENERATION_KEY = 'courses:generation'
+
+FEATURED_COURSES = 3
+
+# Per-worker cache of the home page's featured courses. Keys carry the
+# catalogue generation (see generations.py), so bumping it on add_course
+# retires them in all workers.
+local_cache = LRUCache(max_entries=COURSE_CACHE_SIZE, ttl=COURSE_CACHE_TTL)
+
+
+def course_row(course):
+    return {
+        'id': course.id,
+        'course_title': course.course_title,
+        'region': course.region,
+        'delivery_mode': course.delivery_mode,
+        'start_date': course.start_date,
+        'duration_days': course.duration_days,
+    }
+
+
+def featured_courses(limit=FEATURED_COURSES):
+    key = (generations.get(GENERATION_KEY), limit)
+    rows = local_cache.get(key)
+    if rows is None:
+        with primary():
+            rows = [course_row(c) for c in TrainingCourse.query
+                    .order_by(TrainingCourse.start_date, TrainingCourse.id)
+                    .limit(limit)]
+        local_cache.set(key, rows)
+    return rows
+
+
+def invalidate_courses():
+    generations.bump(GENERATION_KEY)
+    local_cache.clear()
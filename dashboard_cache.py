@@ -0,0 +1,104 @@
+"""Rendered dashboards, cached per (endpoint, role, user, query string).
+
+Keys carry the generation of every scope a page reads from: the viewer's
+own scope, the queue it works or the employee's own nominations, and the
+course catalogue. Write paths bump the scopes they touch, which retires the
+affected pages without tracking them individually. Generations are shared
+through the database (see generations.py), so a bump made by any web worker,
+the job worker, projections.py or archive.py reaches every worker within
+CACHE_GENERATION_SECONDS. The same key gives the page's ETag, so an
+unchanged dashboard is answered with a 304 before any query runs.
+"""
+import hashlib
+import os
+from functools import wraps
+from flask import make_response, request, session
+from cache import LRUCache
+from courses import GENERATION_KEY
+from database import primary
+from generations import generations
+from notifications import QUEUE_STATES
+
+
+DASHBOARD_CACHE_SIZE = int(os.getenv("DASHBOARD_CACHE_SIZE", 512))
+DASHBOARD_CACHE_BYTES = int(os.getenv("DASHBOARD_CACHE_BYTES", 32 * 1024 * 1024))
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", 300))
+
+local_cache = LRUCache(max_entries=DASHBOARD_CACHE_SIZE, ttl=DASHBOARD_CACHE_TTL,
+                       max_bytes=DASHBOARD_CACHE_BYTES)
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def queue_scope(role):
+    return f'queue:{role}'
+
+
+def nominations_scope(user_id):
+    return f'nominations:{user_id}'
+
+
+# Seat counts shown in the course catalogue and beside each nomination in the
+# approver queues; bumped by every decision that holds, releases or confirms
+# a seat.
+SEATS_SCOPE = 'seats'
+
+
+def page_scopes(role, user_id):
+    if role in QUEUE_STATES:
+        return [user_scope(user_id), queue_scope(role), SEATS_SCOPE]
+    return [user_scope(user_id), nominations_scope(user_id), SEATS_SCOPE]
+
+
+def invalidate(*scopes):
+    generations.bump(*(f'dashboard:{scope}' for scope in scopes if scope))
+
+
+def invalidate_transition(from_role, to_role, user_ids):
+    invalidate(
+        queue_scope(from_role) if from_role else None,
+        queue_scope(to_role) if to_role else None,
+        *(nominations_scope(user_id) for user_id in set(user_ids))
+    )
+
+
+def page_key(role, user_id):
+    names = [f'dashboard:{scope}' for scope in page_scopes(role, user_id)] + [GENERATION_KEY]
+    return (
+        request.endpoint, role, user_id, tuple(sorted(request.args.items(multi=True))),
+        tuple(generations.get_many(names))
+    )
+
+
+def cached_dashboard(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        user_id = session.get('user_id')
+        # A page showing flashed messages is rendered once for this request
+        # and never stored or answered with a 304.
+        if not user_id or not DASHBOARD_CACHE_SIZE or '_flashes' in session:
+            return view(*args, **kwargs)
+
+        key = page_key(session.get('user_role'), user_id)
+        etag = hashlib.sha1(repr(key).encode()).hexdigest()
+        if etag in request.if_none_match:
+            response = make_response('', 304)
+        else:
+            body = local_cache.get(key)
+            if body is None:
+                # Rendered from the primary: a lagging replica would store
+                # the old state under the new generation.
+                with primary():
+                    page = view(*args, **kwargs)
+                if not isinstance(page, str):
+                    return page
+                body = page.encode()
+                local_cache.set(key, body)
+            response = make_response(body)
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+    return wrapper
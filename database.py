@@ -0,0 +1,111 @@
+"""Engine settings and read-replica routing.
+
+With DATABASE_REPLICA_URL set, views marked @read_replica run their SELECTs
+on the replica. Writes, SELECT ... FOR UPDATE and everything after the first
+write in a request stay on the primary. So does every request for
+REPLICA_STICKY_SECONDS after a user's last POST, so people see their own
+decisions even while the replica lags behind.
+"""
+import os
+import time
+from contextlib import contextmanager
+from functools import wraps
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql.dml import UpdateBase
+
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", 10))
+# Shorter than the server's or load balancer's idle timeout, so a pooled
+# connection is replaced before it can be dropped underneath us.
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 30000))
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", 10))
+
+REPLICA_BIND = 'replica'
+
+
+def engine_options(url):
+    url = make_url(url)
+    options = {
+        # Checks each connection on checkout, so connections left over from
+        # before a failover are replaced instead of failing a request.
+        'pool_pre_ping': True,
+        'pool_recycle': DB_POOL_RECYCLE,
+    }
+
+    if url.get_backend_name() == 'sqlite':
+        # SQLite has no statement timeout; waiting on a locked database is
+        # what stalls it, so bound that instead.
+        options['connect_args'] = {'timeout': DB_STATEMENT_TIMEOUT_MS / 1000}
+        if url.database in (None, '', ':memory:'):
+            return options
+    elif url.get_backend_name() == 'postgresql':
+        options['connect_args'] = {'options': f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'}
+
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def database_config(url, replica_url=DATABASE_REPLICA_URL):
+    config = {
+        'SQLALCHEMY_DATABASE_URI': url,
+        'SQLALCHEMY_ENGINE_OPTIONS': engine_options(url) if url else {},
+    }
+    if replica_url:
+        config['SQLALCHEMY_BINDS'] = {REPLICA_BIND: dict(engine_options(replica_url), url=replica_url)}
+    return config
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self.reads_from_replica(clause):
+            return self._db.engines[REPLICA_BIND]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def reads_from_replica(self, clause):
+        if not has_app_context():
+            return False
+        if self._flushing or isinstance(clause, UpdateBase) or getattr(clause, '_for_update_arg', None) is not None:
+            g.wrote = True
+            return False
+        return g.get('read_replica', False) and not g.get('wrote', False) and REPLICA_BIND in self._db.engines
+
+
+def read_replica(view):
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.read_replica = time.time() >= session.get('primary_until', 0)
+        g.wrote = False
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@contextmanager
+def primary():
+    # For reads that fill a cache keyed on state the primary has already
+    # moved to, where a lagging replica would pin stale rows under a new key.
+    if not has_app_context():
+        yield
+        return
+    previous = g.get('read_replica', False)
+    g.read_replica = False
+    try:
+        yield
+    finally:
+        g.read_replica = previous
+
+
+def stick_to_primary(response):
+    if request.method == 'POST' and 'user_id' in session and \
+            REPLICA_BIND in current_app.config.get('SQLALCHEMY_BINDS', {}):
+        session['primary_until'] = time.time() + REPLICA_STICKY_SECONDS
+    return response
@@ -0,0 +1,216 @@
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import and_, func, insert, select, update
+from models import db, Nomination, ApprovalLog, Job
+from notifications import employee_scope, queue_role, enter_queue, leave_queue, bump
+from events import publish_transition
+from dashboard_cache import invalidate, invalidate_transition, SEATS_SCOPE
+from seats import hold_seats, release_seats, confirm_seats
+from jobs import job_row
+from event_log import record
+
+
+NO_REASON = 'لم يتم ذكر السبب'
+
+# (role, action) -> state the nomination must be in, state it moves to, the
+# approval log to write (None when the single-item route writes none), the
+# background job to queue for each changed row, if any, and what happens to
+# the course seat it holds (see seats.py).
+TRANSITIONS = {
+    ('admin', 'approve'): {
+        'from': {'status': 'pending', 'final_status': 'draft'},
+        'to': {'status': 'approved', 'final_status': 'draft'},
+        'log': ('approved', 'تمت الموافقة من الرئيس المباشر'),
+        'seats': 'hold',
+    },
+    ('admin', 'reject'): {
+        'from': {'status': 'pending', 'final_status': 'draft'},
+        'to': {'status': 'rejected', 'final_status': 'rejected'},
+        'log': ('rejected', None),
+    },
+    ('hr', 'approve'): {
+        'from': {'status': 'approved', 'final_status': 'draft'},
+        'to': {'status': 'approved', 'final_status': 'approved'},
+        'log': ('approved', 'تمت الموافقة من الموارد البشرية'),
+    },
+    ('hr', 'reject'): {
+        'from': {'status': 'approved', 'final_status': 'draft'},
+        'to': {'status': 'rejected', 'final_status': 'rejected'},
+        'log': ('rejected', None),
+        'seats': 'release',
+    },
+    ('entry', 'approve'): {
+        'from': {'status': 'approved', 'final_status': 'approved'},
+        'to': {'status': 'approved', 'final_status': 'submitted'},
+        'log': ('submitted', 'تم الاعتماد النهائي ورفع الترشيح إلى معهد الإدارة'),
+        'job': 'submit_to_institute',
+        'seats': 'confirm',
+    },
+    ('entry', 'submit'): {
+        'from': {'status': 'approved', 'final_status': 'approved'},
+        'to': {'status': 'approved', 'final_status': 'submitted'},
+        'log': ('submitted', 'تم رفع الترشيح إلى معهد الإدارة'),
+        'job': 'submit_to_institute',
+        'seats': 'confirm',
+    },
+    ('entry', 'reject'): {
+        'from': {'status': 'approved', 'final_status': 'approved'},
+        'to': {'status': 'rejected', 'final_status': 'rejected'},
+        'log': None,
+        'seats': 'release',
+    },
+}
+
+def latest_log_id():
+    return select(func.max(ApprovalLog.id)) \
+        .where(ApprovalLog.nomination_id == Nomination.id) \
+        .scalar_subquery()
+
+
+def last_log_values():
+    # Correlated to the nominations row being updated, so one statement can
+    # rebuild the columns for any number of rows from their logs.
+    def latest(column):
+        return select(column) \
+            .where(ApprovalLog.nomination_id == Nomination.id) \
+            .order_by(ApprovalLog.id.desc()) \
+            .limit(1) \
+            .scalar_subquery()
+
+    return {
+        'last_log_id': latest(ApprovalLog.id),
+        'last_decided_at': latest(ApprovalLog.timestamp),
+        'last_role': latest(ApprovalLog.role),
+    }
+
+
+def parse_ids(values):
+    ids = []
+    for value in values:
+        try:
+            ids.append(int(value))
+        except (TypeError, ValueError):
+            continue
+    return list(dict.fromkeys(ids))
+
+
+def decide_many(role, action, nomination_ids, user_id, reason=None, log_role=None, version=None):
+    """Apply one decision to many nominations in a single transaction.
+
+    The state change is a compare-and-set: rows that are no longer in the
+    expected state (decided concurrently, or missing), or whose version no
+    longer matches when one is given, are left untouched and reported as
+    'skipped'. Approvals that need a seat in a full course are reported as
+    'full'. Every applied change bumps the row's version.
+    """
+    transition = TRANSITIONS.get((role, action))
+    if transition is None:
+        raise ValueError(f"Unsupported decision {action!r} for role {role!r}")
+
+    nomination_ids = parse_ids(nomination_ids)
+    if not nomination_ids:
+        return {}
+
+    rejected = transition['to']['status'] == 'rejected'
+    values = dict(transition['to'])
+    values['rejection_reason'] = (reason or NO_REASON) if rejected else None
+    values['version'] = Nomination.version + 1
+
+    guard = [getattr(Nomination, column) == value for column, value in transition['from'].items()]
+    if version is not None:
+        guard.append(Nomination.version == version)
+
+    seats = transition.get('seats')
+    full = set()
+    if seats == 'hold':
+        # Seats are taken before the state changes, so only the nominations
+        # that got one are approved.
+        candidates = db.session.execute(
+            select(Nomination.id, Nomination.course_id)
+            .where(Nomination.id.in_(nomination_ids), and_(*guard))
+            .order_by(Nomination.id)
+            .with_for_update()
+        ).all()
+        granted = hold_seats(candidates)
+        full = {row.id for row in candidates} - set(granted)
+        held = {row.id: row.course_id for row in candidates if row.id in granted}
+
+    statement = update(Nomination) \
+        .where(Nomination.id.in_(list(held) if seats == 'hold' else nomination_ids), and_(*guard)) \
+        .values(**values) \
+        .returning(Nomination.id, Nomination.user_id, Nomination.course_id) \
+        .execution_options(synchronize_session=False)
+    changed = db.session.execute(statement).all()
+
+    if seats == 'hold':
+        # A row decided between the lock and the update gives its seat back.
+        updated_ids = {row.id for row in changed}
+        release_seats([course_id for nid, course_id in held.items() if nid not in updated_ids])
+    elif seats == 'release':
+        release_seats([row.course_id for row in changed])
+    elif seats == 'confirm':
+        confirm_seats([row.course_id for row in changed])
+
+    if transition['log'] and changed:
+        status, notes = transition['log']
+        now = datetime.utcnow()
+        db.session.execute(insert(ApprovalLog), [
+            {
+                'nomination_id': row.id,
+                'approved_by': user_id,
+                'role': log_role or role,
+                'status': status,
+                'notes': reason if rejected else notes,
+                'timestamp': now,
+                'is_read': False,
+            }
+            for row in changed
+        ])
+        for user, count in Counter(row.user_id for row in changed).items():
+            bump(employee_scope(user), count)
+
+        db.session.execute(
+            update(Nomination)
+            .where(Nomination.id.in_([row.id for row in changed]))
+            .values(last_log_id=latest_log_id(), last_decided_at=now, last_role=log_role or role)
+            .execution_options(synchronize_session=False)
+        )
+
+    if transition.get('job') and changed:
+        kind = transition['job']
+        db.session.execute(insert(Job), [
+            job_row(kind, {'nomination_id': row.id}, f"{kind}:{row.id}", user_id)
+            for row in changed
+        ])
+
+    # Every applied change is logged here, including entry rejections, which
+    # write no approval log.
+    for row in changed:
+        record(f"nomination.{role}.{action}", 'nomination', row.id, user_id,
+               employee_id=row.user_id, course_id=row.course_id, reason=values['rejection_reason'],
+               **transition['to'])
+
+    leave_queue(queue_role(**transition['from']), [row.id for row in changed])
+    enter_queue(queue_role(**transition['to']), len(changed))
+
+    db.session.commit()
+
+    if changed:
+        invalidate_transition(queue_role(**transition['from']), queue_role(**transition['to']),
+                              [row.user_id for row in changed])
+        if seats:
+            invalidate(SEATS_SCOPE)
+    publish_transition(queue_role(**transition['from']), queue_role(**transition['to']),
+                       [row.id for row in changed])
+
+    updated = {row.id for row in changed}
+    return {
+        nid: 'updated' if nid in updated else 'full' if nid in full else 'skipped'
+        for nid in nomination_ids
+    }
+
+
+def decide(role, action, nomination_id, user_id, reason=None, log_role=None, version=None):
+    """Returns 'updated', 'skipped' or 'full', as decide_many does per row."""
+    result = decide_many(role, action, [nomination_id], user_id, reason, log_role, version)
+    return next(iter(result.values()), 'skipped')
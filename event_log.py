@@ -0,0 +1,50 @@
+"""Append-only log of domain events in the domain_events table.
+
+Routes call record() for every change they make; the events are kept on the
+session and written with a single multi-row INSERT when it commits, so they
+land in the same transaction as the change itself and disappear with it on a
+rollback. Rows are never updated or deleted: projections.py builds the read
+models from them, and ApprovalLog stays the history shown to users.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import event, insert
+from database import RoutingSession
+from models import db, DomainEvent
+
+
+PENDING = 'pending_events'
+
+
+def event_row(kind, aggregate, aggregate_id=None, actor_id=None, created_at=None, **data):
+    return {
+        'kind': kind,
+        'aggregate': aggregate,
+        'aggregate_id': aggregate_id,
+        'actor_id': actor_id,
+        'data': json.dumps(data, ensure_ascii=False, default=str),
+        'created_at': created_at or datetime.utcnow(),
+    }
+
+
+def record(kind, aggregate, aggregate_id=None, actor_id=None, **data):
+    # Pending events belong to the transaction, which may not have started
+    # yet when nothing has been read.
+    session = db.session()
+    if not session.in_transaction():
+        session.begin()
+    session.info.setdefault(PENDING, []).append(event_row(kind, aggregate, aggregate_id, actor_id, **data))
+
+
+@event.listens_for(RoutingSession, 'before_commit')
+def write_pending(session):
+    rows = session.info.pop(PENDING, None)
+    if rows:
+        session.execute(insert(DomainEvent), rows)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def drop_pending(session, transaction):
+    # Left over only when the transaction was rolled back or closed.
+    if transaction.parent is None:
+        session.info.pop(PENDING, None)
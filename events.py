@@ -0,0 +1,134 @@
+import json
+import os
+import queue
+import threading
+import time
+from sqlalchemy import select
+from models import db, User, TrainingCourse, Nomination
+from notifications import unread_count
+
+
+EVENT_KEEPALIVE = int(os.getenv("EVENT_KEEPALIVE", 15))
+EVENT_STREAM_SECONDS = int(os.getenv("EVENT_STREAM_SECONDS", 300))
+EVENT_BUFFER = int(os.getenv("EVENT_BUFFER", 100))
+EVENT_RETRY_MS = 3000
+
+
+class Subscription:
+    def __init__(self, broker, channels, buffer):
+        self.broker = broker
+        self.channels = channels
+        self.queue = queue.Queue(maxsize=buffer)
+
+    def get(self, timeout=None):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class LocalBroker:
+    """Stand-in for a shared pub/sub server, with the publish/subscribe calls
+    a Redis client would provide. Reaches subscribers in this process only."""
+
+    def __init__(self, buffer=EVENT_BUFFER):
+        self.buffer = buffer
+        self._channels = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, list(channels), self.buffer)
+        with self._lock:
+            for channel in subscription.channels:
+                self._channels.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._channels.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._channels[channel]
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._channels.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.queue.put_nowait(message)
+            except queue.Full:
+                # A stalled client misses events; its next page load or
+                # reconnect shows the current state anyway.
+                pass
+
+
+broker = LocalBroker()
+
+
+def configure_broker(backend):
+    global broker
+    broker = backend
+
+
+def queue_channel(role):
+    return f'queue:{role}'
+
+
+def nomination_rows(nomination_ids):
+    statement = select(Nomination.id, Nomination.submission_date, User.full_name, TrainingCourse.course_title) \
+        .join(User, Nomination.user_id == User.id) \
+        .join(TrainingCourse, Nomination.course_id == TrainingCourse.id) \
+        .where(Nomination.id.in_(nomination_ids))
+    return db.session.execute(statement).all()
+
+
+def publish_transition(from_role, to_role, nomination_ids):
+    """Tell connected approver dashboards about nominations that changed
+    queue; call after the commit so listeners never see state that may roll
+    back. Employees see decisions when they next load their dashboard."""
+    if not nomination_ids:
+        return
+
+    if from_role:
+        broker.publish(queue_channel(from_role), {'event': 'dequeued', 'ids': list(nomination_ids)})
+
+    if to_role:
+        broker.publish(queue_channel(to_role), {
+            'event': 'queued',
+            'nominations': [
+                {
+                    'id': row.id,
+                    'full_name': row.full_name,
+                    'course_title': row.course_title,
+                    'submission_date': row.submission_date.strftime('%Y-%m-%d'),
+                }
+                for row in nomination_rows(nomination_ids)
+            ],
+        })
+
+
+def event_stream(scope, channels):
+    # Streams end after EVENT_STREAM_SECONDS and the browser reconnects, so a
+    # long-lived tab never pins a worker thread indefinitely. The counter is
+    # seeded before subscribing; deliveries then only read it.
+    unread_count(scope)
+    db.session.remove()
+    subscription = broker.subscribe(channels)
+    deadline = time.monotonic() + EVENT_STREAM_SECONDS
+    try:
+        yield f"retry: {EVENT_RETRY_MS}\n\n"
+        while time.monotonic() < deadline:
+            message = subscription.get(timeout=EVENT_KEEPALIVE)
+            if message is None:
+                yield ": keepalive\n\n"
+                continue
+            message = dict(message, unread=unread_count(scope))
+            db.session.remove()
+            yield f"event: {message['event']}\ndata: {json.dumps(message, ensure_ascii=False)}\n\n"
+    finally:
+        subscription.close()
@@ -0,0 +1,107 @@
+import csv
+import io
+import tempfile
+from sqlalchemy import select
+from sqlalchemy.orm import aliased
+from models import db, User, TrainingCourse, Nomination, ApprovalLog
+
+
+EXPORT_CHUNK_SIZE = 1000
+STREAM_BLOCK_SIZE = 64 * 1024
+
+NOMINATION_COLUMNS = [
+    ('nomination_id', Nomination.id),
+    ('employee', User.full_name),
+    ('job_number', User.job_number),
+    ('course', TrainingCourse.course_title),
+    ('region', TrainingCourse.region),
+    ('delivery_mode', TrainingCourse.delivery_mode),
+    ('start_date', TrainingCourse.start_date),
+    ('status', Nomination.status),
+    ('final_status', Nomination.final_status),
+    ('submission_date', Nomination.submission_date),
+    ('rejection_reason', Nomination.rejection_reason),
+]
+
+Approver = aliased(User)
+
+APPROVAL_LOG_COLUMNS = [
+    ('log_id', ApprovalLog.id),
+    ('nomination_id', ApprovalLog.nomination_id),
+    ('employee', User.full_name),
+    ('course', TrainingCourse.course_title),
+    ('approver', Approver.full_name),
+    ('role', ApprovalLog.role),
+    ('status', ApprovalLog.status),
+    ('notes', ApprovalLog.notes),
+    ('timestamp', ApprovalLog.timestamp),
+]
+
+
+def nominations_statement(status=None, final_status=None):
+    statement = select(*(column for _, column in NOMINATION_COLUMNS)) \
+        .join(User, Nomination.user_id == User.id) \
+        .join(TrainingCourse, Nomination.course_id == TrainingCourse.id) \
+        .order_by(Nomination.id)
+    if status:
+        statement = statement.where(Nomination.status == status)
+    if final_status:
+        statement = statement.where(Nomination.final_status == final_status)
+    return statement
+
+
+def approval_logs_statement(role=None):
+    statement = select(*(column for _, column in APPROVAL_LOG_COLUMNS)) \
+        .join(Nomination, ApprovalLog.nomination_id == Nomination.id) \
+        .join(User, Nomination.user_id == User.id) \
+        .join(TrainingCourse, Nomination.course_id == TrainingCourse.id) \
+        .outerjoin(Approver, ApprovalLog.approved_by == Approver.id) \
+        .order_by(ApprovalLog.id)
+    if role:
+        statement = statement.where(ApprovalLog.role == role)
+    return statement
+
+
+def chunks(statement):
+    # yield_per turns on a server-side cursor where the driver supports it,
+    # so only one chunk of rows is ever held in memory.
+    result = db.session.execute(statement.execution_options(yield_per=EXPORT_CHUNK_SIZE))
+    for partition in result.partitions():
+        yield partition
+
+
+def stream_csv(statement, headers):
+    import pandas as pd
+
+    # BOM so Excel opens the Arabic text as UTF-8.
+    yield '\ufeff'
+
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(headers)
+    yield buffer.getvalue()
+
+    for partition in chunks(statement):
+        frame = pd.DataFrame.from_records(partition, columns=headers)
+        yield frame.to_csv(index=False, header=False)
+
+
+def stream_xlsx(statement, headers, title):
+    from openpyxl import Workbook
+
+    # Write-only workbooks flush rows to disk as they are appended; the
+    # finished file is then sent in fixed-size blocks.
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(title)
+    sheet.append(headers)
+    for partition in chunks(statement):
+        for row in partition:
+            sheet.append(list(row))
+
+    with tempfile.TemporaryFile() as spool:
+        workbook.save(spool)
+        spool.seek(0)
+        while True:
+            block = spool.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
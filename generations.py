@@ -0,0 +1,82 @@
+"""Generation counters shared by every process through the cache_generations
+table. Caches build their keys from these counters, so bumping one after a
+write retires the entries that depend on it in all web workers, and bumps
+made by the job worker, projections.py and archive.py reach them too.
+
+Reads are served from memory for up to CACHE_GENERATION_SECONDS, so other
+processes see a bump within that time; this process sees its own at once.
+"""
+import os
+import threading
+import time
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, CacheGeneration
+
+
+CACHE_GENERATION_SECONDS = float(os.getenv("CACHE_GENERATION_SECONDS", 1))
+
+
+class Generations:
+    def __init__(self, ttl=CACHE_GENERATION_SECONDS):
+        self.ttl = ttl
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, values):
+        expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            for name, value in values.items():
+                # Counters only grow, so a read that raced a bump must not
+                # bring back the older value.
+                previous = self._values.get(name, (0, 0))[1]
+                self._values[name] = (expires_at, max(value, previous))
+
+    def get_many(self, names):
+        now = time.monotonic()
+        with self._lock:
+            known = {name: self._values.get(name) for name in names}
+        stale = [name for name, entry in known.items() if entry is None or entry[0] <= now]
+        if stale:
+            with db.engine.connect() as conn:
+                rows = dict(conn.execute(
+                    select(CacheGeneration.name, CacheGeneration.value).where(CacheGeneration.name.in_(stale))
+                ).all())
+            self._remember({name: rows.get(name, 0) for name in stale})
+            with self._lock:
+                known = {name: self._values[name] for name in names}
+        return [known[name][1] for name in names]
+
+    def get(self, name):
+        return self.get_many([name])[0]
+
+    def bump(self, *names):
+        names = sorted({name for name in names if name})
+        if not names:
+            return
+        for attempt in range(2):
+            try:
+                with db.engine.begin() as conn:
+                    values = dict(conn.execute(
+                        update(CacheGeneration)
+                        .where(CacheGeneration.name.in_(names))
+                        .values(value=CacheGeneration.value + 1)
+                        .returning(CacheGeneration.name, CacheGeneration.value)
+                    ).all())
+                    missing = [name for name in names if name not in values]
+                    if missing:
+                        conn.execute(insert(CacheGeneration), [{'name': name, 'value': 1} for name in missing])
+                        values.update(dict.fromkeys(missing, 1))
+                break
+            except IntegrityError:
+                # Another process created the same counter first.
+                if attempt:
+                    raise
+        self._remember(values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+generations = Generations()
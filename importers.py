@@ -0,0 +1,221 @@
+import csv
+import io
+import os
+from datetime import date, datetime
+from itertools import islice
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+from models import db, User, TrainingCourse
+from auth import hash_password
+from event_log import record
+from jobs import enqueue
+
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 500))
+# Users are hashed by the job worker, one job per chunk of this many rows;
+# keep it small enough to hash within JOB_LEASE_SECONDS.
+IMPORT_USER_CHUNK_SIZE = int(os.getenv("IMPORT_USER_CHUNK_SIZE", 200))
+
+COURSE_FIELDS = ['course_title', 'region', 'delivery_mode', 'start_date', 'duration_days', 'capacity']
+USER_FIELDS = [
+    'full_name', 'national_id', 'email', 'phone_number', 'job_number',
+    'qualification', 'specialization', 'password'
+]
+USER_UNIQUE_FIELDS = ['job_number', 'email', 'national_id']
+
+
+def read_rows(filename, stream):
+    """Yield (row_number, dict) from an uploaded CSV or XLSX file."""
+    if filename.lower().endswith('.xlsx'):
+        from openpyxl import load_workbook
+
+        sheet = load_workbook(stream, read_only=True).active
+        rows = sheet.iter_rows(values_only=True)
+        headers = [str(h).strip() if h is not None else '' for h in next(rows, [])]
+        for number, values in enumerate(rows, start=2):
+            if any(v not in (None, '') for v in values):
+                yield number, dict(zip(headers, values))
+    else:
+        text = io.TextIOWrapper(stream, encoding='utf-8-sig')
+        for number, row in enumerate(csv.DictReader(text), start=2):
+            yield number, {(k or '').strip(): v for k, v in row.items()}
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def clean(value):
+    if value is None:
+        return None
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def parse_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def validate_course(row):
+    values = {field: clean(row.get(field)) for field in COURSE_FIELDS}
+    if not values['course_title']:
+        return None, "عنوان الدورة مطلوب"
+    try:
+        if values['start_date']:
+            values['start_date'] = parse_date(values['start_date'])
+        if values['duration_days'] is not None:
+            values['duration_days'] = int(values['duration_days'])
+        if values['capacity'] is not None:
+            values['capacity'] = int(values['capacity'])
+    except (TypeError, ValueError):
+        return None, "تاريخ البدء أو مدة الدورة أو عدد المقاعد غير صالح"
+    values['created_at'] = datetime.utcnow()
+    return values, None
+
+
+def validate_user(row):
+    values = {field: clean(row.get(field)) for field in USER_FIELDS}
+    for field in ['full_name', 'national_id', 'email', 'job_number', 'password']:
+        if not values[field]:
+            return None, f"الحقل {field} مطلوب"
+    for field in ['national_id', 'job_number', 'phone_number']:
+        if values[field] is not None:
+            values[field] = str(values[field])
+    return values, None
+
+
+def import_courses(rows, actor_id=None):
+    report = {'inserted': 0, 'errors': []}
+
+    for chunk in chunked(rows, IMPORT_CHUNK_SIZE):
+        valid = []
+        for number, row in chunk:
+            values, error = validate_course(row)
+            if error:
+                report['errors'].append({'row': number, 'error': error})
+            else:
+                valid.append(values)
+
+        if valid:
+            db.session.execute(insert(TrainingCourse), valid)
+            record('course.imported', 'course', None, actor_id, count=len(valid),
+                   course_titles=[values['course_title'] for values in valid])
+            db.session.commit()
+            report['inserted'] += len(valid)
+
+    return report
+
+
+def existing_user_keys(chunk_values):
+    # One lookup per chunk for every unique field at once.
+    conditions = [
+        getattr(User, field).in_({v[field] for v in chunk_values})
+        for field in USER_UNIQUE_FIELDS
+    ]
+    taken = {field: set() for field in USER_UNIQUE_FIELDS}
+    statement = select(*(getattr(User, field) for field in USER_UNIQUE_FIELDS)).where(or_(*conditions))
+    for row in db.session.execute(statement):
+        for field in USER_UNIQUE_FIELDS:
+            taken[field].add(getattr(row, field))
+    return taken
+
+
+def user_clash(values, *taken_sets):
+    return next(
+        (field for field in USER_UNIQUE_FIELDS
+         if any(values[field] in taken[field] for taken in taken_sets)),
+        None
+    )
+
+
+def insert_users(valid, report):
+    """Insert a chunk of (row_number, values); rows another request inserted
+    since the chunk was checked are reported instead of failing the import."""
+    while valid:
+        try:
+            db.session.execute(insert(User), [values for _, values in valid])
+            return [values for _, values in valid]
+        except IntegrityError:
+            db.session.rollback()
+            taken = existing_user_keys([values for _, values in valid])
+            remaining = []
+            for number, values in valid:
+                clash = user_clash(values, taken)
+                if clash:
+                    report['errors'].append({'row': number, 'error': f"يوجد مستخدم مسجل بنفس {clash}"})
+                else:
+                    remaining.append((number, values))
+            if len(remaining) == len(valid):
+                raise
+            valid = remaining
+    return []
+
+
+def import_users(rows, role='employee', actor_id=None):
+    """Checks the rows and queues the valid ones as import_users jobs: hashing
+    thousands of passwords takes longer than a request may run. Each job's
+    /jobs/<id> reports the rows it inserted and any that clashed meanwhile."""
+    report = {'queued': 0, 'jobs': [], 'errors': []}
+    seen = {field: set() for field in USER_UNIQUE_FIELDS}
+
+    for chunk in chunked(rows, IMPORT_USER_CHUNK_SIZE):
+        candidates = []
+        for number, row in chunk:
+            values, error = validate_user(row)
+            if error:
+                report['errors'].append({'row': number, 'error': error})
+            else:
+                candidates.append((number, values))
+
+        if not candidates:
+            continue
+
+        taken = existing_user_keys([values for _, values in candidates])
+        valid = []
+        for number, values in candidates:
+            clash = user_clash(values, taken, seen)
+            if clash:
+                report['errors'].append({'row': number, 'error': f"يوجد مستخدم مسجل بنفس {clash}"})
+                continue
+            for field in USER_UNIQUE_FIELDS:
+                seen[field].add(values[field])
+            valid.append((number, values))
+
+        if not valid:
+            continue
+
+        job = enqueue('import_users', {'role': role, 'actor_id': actor_id, 'rows': valid}, created_by=actor_id)
+        db.session.commit()
+        report['jobs'].append(job.id)
+        report['queued'] += len(valid)
+
+    return report
+
+
+def insert_user_rows(payload):
+    """Runs an import_users job: hashes the chunk's passwords and inserts it."""
+    report = {'inserted': 0, 'errors': []}
+    now = datetime.utcnow()
+    valid = []
+    for number, values in payload['rows']:
+        values.update(password_hash=hash_password(values.pop('password')), role=payload['role'], created_at=now)
+        valid.append((number, values))
+
+    inserted = insert_users(valid, report)
+    if inserted:
+        record('user.imported', 'user', None, payload['actor_id'], count=len(inserted), role=payload['role'],
+               job_numbers=[values['job_number'] for values in inserted])
+        db.session.commit()
+        report['inserted'] = len(inserted)
+    return report
@@ -0,0 +1,263 @@
+"""Background jobs, stored in the jobs table and run by a separate worker:
+
+    python jobs.py --workers 4
+
+Jobs are added inside the transaction of the change that asks for them, so a
+job exists exactly when that change was committed: enqueue() adds one, and
+decide_many inserts job_row()s for a whole batch of nominations at once.
+"""
+import argparse
+import json
+import os
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+from sqlalchemy import and_, or_, select, update
+from models import db, Nomination, Job
+from dashboard_cache import invalidate, queue_scope, nominations_scope
+from event_log import record
+
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", os.cpu_count() or 2))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_SECONDS = int(os.getenv("JOB_RETRY_SECONDS", 30))
+INSTITUTE_URL = os.getenv("INSTITUTE_URL")
+
+# Removed from the stored payload once a job settles, so secrets are only
+# kept while the job is still pending: imported rows carry plaintext passwords.
+SECRET_FIELDS = {'rows'}
+
+
+class PermanentError(Exception):
+    """Raised by a handler when retrying cannot succeed."""
+
+
+def submit_to_institute(payload):
+    nomination = db.session.get(Nomination, payload['nomination_id'])
+    if nomination is None:
+        raise PermanentError("nomination not found")
+    if not INSTITUTE_URL:
+        # Nothing can be sent, so the nomination stays 'submitted'. The job
+        # is retried with backoff and still goes out if INSTITUTE_URL is set
+        # before its attempts run out.
+        raise RuntimeError("INSTITUTE_URL is not set; the nomination was not sent")
+
+    import requests
+
+    response = requests.post(INSTITUTE_URL, timeout=30, headers={
+        'Idempotency-Key': f"nomination-{nomination.id}",
+    }, json={
+        'nomination_id': nomination.id,
+        'national_id': nomination.user.national_id,
+        'full_name': nomination.user.full_name,
+        'job_number': nomination.user.job_number,
+        'course_title': nomination.course.course_title,
+        'start_date': nomination.course.start_date.isoformat() if nomination.course.start_date else None,
+    })
+    if 400 <= response.status_code < 500 and response.status_code != 429:
+        raise PermanentError(f"institute rejected the nomination: {response.status_code}")
+    response.raise_for_status()
+
+    delivered = db.session.execute(
+        update(Nomination)
+        .where(Nomination.id == nomination.id, Nomination.final_status == 'submitted')
+        .values(final_status='final_submitted', version=Nomination.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if delivered:
+        record('nomination.delivered', 'nomination', nomination.id, None,
+               employee_id=nomination.user_id, course_id=nomination.course_id,
+               status='approved', final_status='final_submitted')
+    db.session.commit()
+    if delivered:
+        invalidate(queue_scope('entry'), nominations_scope(nomination.user_id))
+    return {'delivered': bool(delivered)}
+
+
+def import_users(payload):
+    from importers import insert_user_rows
+
+    return insert_user_rows(payload)
+
+
+HANDLERS = {
+    'submit_to_institute': submit_to_institute,
+    'import_users': import_users,
+}
+
+
+def job_row(kind, payload, idempotency_key=None, created_by=None):
+    now = datetime.utcnow()
+    return {
+        'kind': kind,
+        'payload': json.dumps(payload, ensure_ascii=False),
+        'status': 'queued',
+        'idempotency_key': idempotency_key,
+        'attempts': 0,
+        'max_attempts': JOB_MAX_ATTEMPTS,
+        'run_after': now,
+        'created_by': created_by,
+        'created_at': now,
+        'updated_at': now,
+    }
+
+
+def enqueue(kind, payload, idempotency_key=None, created_by=None):
+    """Add a job to the current transaction. A key that was already used
+    returns the existing job, so a retried request does not run twice."""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    if idempotency_key:
+        existing = Job.query.filter_by(idempotency_key=idempotency_key).first()
+        if existing:
+            return existing
+
+    job = Job(**job_row(kind, payload, idempotency_key, created_by))
+    db.session.add(job)
+    db.session.flush()
+    return job
+
+
+def job_status(job):
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'run_after': job.run_after.isoformat() if job.status == 'queued' else None,
+        'last_error': job.last_error,
+        'result': json.loads(job.result) if job.result else None,
+        'created_at': job.created_at.isoformat(),
+        'updated_at': job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+
+def due(now):
+    # Queued jobs whose time has come, plus running ones whose worker let the
+    # lease expire (crashed or killed mid-job).
+    return or_(
+        and_(Job.status == 'queued', Job.run_after <= now),
+        and_(Job.status == 'running', Job.locked_until < now),
+    )
+
+
+def claim(limit):
+    now = datetime.utcnow()
+    candidates = select(Job.id) \
+        .where(due(now)) \
+        .order_by(Job.run_after, Job.id) \
+        .limit(limit)
+    job_ids = db.session.execute(candidates).scalars().all()
+    if not job_ids:
+        db.session.rollback()
+        return []
+
+    # Guarded like the nomination transitions: a job another worker claimed
+    # in between no longer matches due() and is left out.
+    claimed = db.session.execute(
+        update(Job)
+        .where(Job.id.in_(job_ids), due(now))
+        .values(
+            status='running',
+            attempts=Job.attempts + 1,
+            locked_until=now + timedelta(seconds=JOB_LEASE_SECONDS),
+            updated_at=now
+        )
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.session.commit()
+    return claimed
+
+
+def scrubbed(payload):
+    data = json.loads(payload)
+    return json.dumps({k: v for k, v in data.items() if k not in SECRET_FIELDS}, ensure_ascii=False)
+
+
+def settle(job, ok, value, permanent=False):
+    now = datetime.utcnow()
+    values = {'locked_until': None, 'updated_at': now}
+    if ok:
+        values.update(status='done', result=json.dumps(value, ensure_ascii=False), last_error=None,
+                      payload=scrubbed(job.payload))
+    elif permanent or job.attempts >= job.max_attempts:
+        values.update(status='failed', last_error=value, payload=scrubbed(job.payload))
+    else:
+        delay = JOB_RETRY_SECONDS * 2 ** (job.attempts - 1)
+        values.update(status='queued', last_error=value, run_after=now + timedelta(seconds=delay))
+
+    db.session.execute(
+        update(Job)
+        .where(Job.id == job.id, Job.status == 'running', Job.attempts == job.attempts)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+
+
+def init_worker():
+    from app import create_app
+
+    create_app().app_context().push()
+    # Connections inherited from the dispatcher must not be shared.
+    for engine in db.engines.values():
+        engine.dispose(close=False)
+
+
+def run_job(kind, payload):
+    # Runs in a pool process; the outcome is returned rather than raised so
+    # handler exceptions never have to be pickled back to the dispatcher.
+    try:
+        return True, HANDLERS[kind](json.loads(payload)), False
+    except PermanentError as e:
+        db.session.rollback()
+        return False, str(e), True
+    except Exception:
+        db.session.rollback()
+        return False, traceback.format_exc(limit=5), False
+    finally:
+        db.session.remove()
+
+
+def work(workers=JOB_WORKERS, burst=False):
+    """Dispatch due jobs to a pool of worker processes. With burst=True,
+    return once nothing is due instead of polling forever."""
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker) as pool:
+        running = {}
+        while True:
+            if len(running) < workers:
+                for job in claim(workers - len(running)):
+                    running[pool.submit(run_job, job.kind, job.payload)] = job
+
+            if not running:
+                if burst:
+                    return
+                time.sleep(JOB_POLL_SECONDS)
+                continue
+
+            done, _ = wait(running, timeout=JOB_POLL_SECONDS, return_when=FIRST_COMPLETED)
+            for future in done:
+                job = running.pop(future)
+                try:
+                    ok, value, permanent = future.result()
+                except Exception:
+                    ok, value, permanent = False, traceback.format_exc(limit=5), False
+                settle(job, ok, value, permanent)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run queued background jobs.")
+    parser.add_argument('--workers', type=int, default=JOB_WORKERS)
+    parser.add_argument('--burst', action='store_true', help="exit once no job is due")
+    args = parser.parse_args()
+
+    from app import create_app
+    import jobs
+
+    with create_app().app_context():
+        jobs.work(args.workers, args.burst)
@@ -0,0 +1,188 @@
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from flask import Response, abort, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from models import db
+
+
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", 1000))
+SLOW_REQUEST_STATEMENTS = int(os.getenv("SLOW_REQUEST_STATEMENTS", 100))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 1000)
+
+slow_log = logging.getLogger('bader.slow')
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.total = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+        self.total += 1
+        self.sum += value
+
+
+class RouteStats:
+    def __init__(self):
+        self.duration = Histogram(DURATION_BUCKETS)
+        self.statements = Histogram(STATEMENT_BUCKETS)
+        self.sql_seconds = 0.0
+        self.template_seconds = 0.0
+        self.responses = defaultdict(int)
+
+
+# Per-process registry; with several gunicorn workers each one exposes its
+# own numbers and Prometheus sums them per instance.
+stats = defaultdict(RouteStats)
+stats_lock = threading.Lock()
+
+
+def start_request():
+    g.request_started = time.perf_counter()
+    g.sql_statements = 0
+    g.sql_seconds = 0.0
+    g.template_seconds = 0.0
+
+
+def finish_request(response):
+    started = g.get('request_started')
+    if started is None or request.endpoint in (None, 'static', 'metrics'):
+        return response
+
+    elapsed = time.perf_counter() - started
+    key = (request.endpoint, request.method)
+    with stats_lock:
+        route = stats[key]
+        route.duration.observe(elapsed)
+        route.statements.observe(g.sql_statements)
+        route.sql_seconds += g.sql_seconds
+        route.template_seconds += g.template_seconds
+        route.responses[response.status_code] += 1
+
+    if elapsed * 1000 >= SLOW_REQUEST_MS or g.sql_statements >= SLOW_REQUEST_STATEMENTS:
+        slow_log.warning(
+            "slow request %s %s: %.1f ms, %d statements, %.1f ms SQL, %.1f ms templates",
+            request.method, request.path, elapsed * 1000, g.sql_statements,
+            g.sql_seconds * 1000, g.template_seconds * 1000
+        )
+    return response
+
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['query_started'].pop()
+
+    if has_request_context() and 'sql_statements' in g:
+        g.sql_statements += 1
+        g.sql_seconds += elapsed
+
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        slow_log.warning(
+            "slow query (%.1f ms) in %s: %s",
+            elapsed * 1000,
+            request.endpoint if has_request_context() else '-',
+            ' '.join(statement.split())[:1000]
+        )
+
+
+def template_started(sender, template, context, **extra):
+    if has_request_context():
+        g.setdefault('template_starts', []).append(time.perf_counter())
+
+
+def template_finished(sender, template, context, **extra):
+    if has_request_context() and g.get('template_starts') and 'template_seconds' in g:
+        g.template_seconds += time.perf_counter() - g.template_starts.pop()
+
+
+def label_string(**labels):
+    return ','.join(f'{name}="{value}"' for name, value in labels.items())
+
+
+def histogram_lines(name, histogram, labels):
+    lines = []
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        lines.append(f'{name}_bucket{{{label_string(**labels, le=bound)}}} {count}')
+    lines.append(f'{name}_bucket{{{label_string(**labels, le="+Inf")}}} {histogram.total}')
+    lines.append(f'{name}_sum{{{label_string(**labels)}}} {histogram.sum}')
+    lines.append(f'{name}_count{{{label_string(**labels)}}} {histogram.total}')
+    return lines
+
+
+def render_metrics():
+    lines = [
+        '# HELP bader_request_duration_seconds Wall time per request.',
+        '# TYPE bader_request_duration_seconds histogram',
+    ]
+    with stats_lock:
+        snapshot = sorted(stats.items())
+        for (endpoint, method), route in snapshot:
+            lines += histogram_lines('bader_request_duration_seconds', route.duration,
+                                     {'endpoint': endpoint, 'method': method})
+
+        lines += [
+            '# HELP bader_request_sql_statements SQL statements issued per request.',
+            '# TYPE bader_request_sql_statements histogram',
+        ]
+        for (endpoint, method), route in snapshot:
+            lines += histogram_lines('bader_request_sql_statements', route.statements,
+                                     {'endpoint': endpoint, 'method': method})
+
+        lines += [
+            '# HELP bader_sql_seconds_total Time spent executing SQL.',
+            '# TYPE bader_sql_seconds_total counter',
+        ]
+        for (endpoint, method), route in snapshot:
+            lines.append(f'bader_sql_seconds_total{{{label_string(endpoint=endpoint, method=method)}}} {route.sql_seconds}')
+
+        lines += [
+            '# HELP bader_template_render_seconds_total Time spent rendering templates.',
+            '# TYPE bader_template_render_seconds_total counter',
+        ]
+        for (endpoint, method), route in snapshot:
+            lines.append(f'bader_template_render_seconds_total{{{label_string(endpoint=endpoint, method=method)}}} {route.template_seconds}')
+
+        lines += [
+            '# HELP bader_responses_total Responses by status code.',
+            '# TYPE bader_responses_total counter',
+        ]
+        for (endpoint, method), route in snapshot:
+            for status, count in sorted(route.responses.items()):
+                lines.append(f'bader_responses_total{{{label_string(endpoint=endpoint, method=method, status=status)}}} {count}')
+
+    return '\n'.join(lines) + '\n'
+
+
+def metrics():
+    if METRICS_TOKEN and request.headers.get('Authorization') != f'Bearer {METRICS_TOKEN}':
+        abort(403)
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def init_metrics(app):
+    app.before_request(start_request)
+    app.after_request(finish_request)
+    app.add_url_rule('/metrics', 'metrics', metrics)
+
+    before_render_template.connect(template_started, app)
+    template_rendered.connect(template_finished, app)
+
+    with app.app_context():
+        for engine in db.engines.values():
+            event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+            event.listen(engine, 'after_cursor_execute', after_cursor_execute)
@@ -0,0 +1,202 @@
+from datetime import datetime
+from sqlalchemy import delete, func, insert, inspect, select, text, update
+from decisions import last_log_values
+from models import db, User, TrainingCourse, Nomination, ApprovalLog, UnreadCounter, NominationRead, Job, AnalyticsRollup, \
+    ArchivedNomination, ArchivedApprovalLog, DomainEvent, ProjectionOffset, TimelineEntry, CourseStats, \
+    CacheGeneration, schema_migrations
+from notifications import QUEUE_STATES, queue_filter, recount_all
+from seats import recount_seats
+from event_log import event_row
+
+
+def create_indexes(conn, table, names):
+    for index in table.indexes:
+        if index.name in names:
+            index.create(conn, checkfirst=True)
+
+
+def add_columns(conn, table, names):
+    existing = {column['name'] for column in inspect(conn).get_columns(table.name)}
+    for column in table.columns:
+        if column.name in names and column.name not in existing:
+            ddl = f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column.type.compile(conn.dialect)}"
+            if column.server_default is not None:
+                ddl += f" DEFAULT {column.server_default.arg}"
+            if not column.nullable:
+                ddl += " NOT NULL"
+            conn.execute(text(ddl))
+
+
+def backfill_last_log(conn, batch_size=5000):
+    # Rebuilds Nomination.last_* from approval_logs in id ranges, so it can
+    # also be re-run on a live database to repair drift.
+    last_id = conn.execute(select(func.max(Nomination.id))).scalar() or 0
+    for start in range(0, last_id, batch_size):
+        conn.execute(
+            update(Nomination)
+            .where(Nomination.id > start, Nomination.id <= start + batch_size)
+            .values(**last_log_values())
+        )
+
+
+def m0001_unread_counters(conn):
+    UnreadCounter.__table__.create(conn, checkfirst=True)
+
+
+def m0002_workflow_indexes(conn):
+    duplicates = conn.execute(text(
+        "SELECT user_id, course_id FROM nominations "
+        "GROUP BY user_id, course_id HAVING COUNT(*) > 1"
+    )).fetchall()
+    if duplicates:
+        pairs = ', '.join(f"({row.user_id}, {row.course_id})" for row in duplicates)
+        raise RuntimeError(f"Duplicate nominations must be resolved before migrating: {pairs}")
+
+    create_indexes(conn, Nomination.__table__, {
+        'uq_nominations_user_course',
+        'ix_nominations_status_submission',
+        'ix_nominations_final_status_submission',
+        'ix_nominations_user_submission',
+    })
+    create_indexes(conn, ApprovalLog.__table__, {
+        'ix_approval_logs_role_timestamp',
+        'ix_approval_logs_nomination_read',
+    })
+
+
+def m0003_course_indexes(conn):
+    create_indexes(conn, TrainingCourse.__table__, {
+        'ix_training_courses_start_date',
+        'ix_training_courses_region_mode',
+    })
+
+
+def m0004_read_receipts(conn):
+    NominationRead.__table__.create(conn, checkfirst=True)
+
+    # Carry the old global is_read flag over as a receipt for every user
+    # of the role whose queue the nomination is in.
+    for role in QUEUE_STATES:
+        source = select(User.id, Nomination.id, func.now()) \
+            .join(User, User.role == role) \
+            .where(Nomination.is_read == True, *queue_filter(role))
+        conn.execute(insert(NominationRead).from_select(['user_id', 'nomination_id', 'read_at'], source))
+
+    # Queue counters are per viewer now; the old per-role rows are dropped
+    # and reseeded on first read.
+    conn.execute(delete(UnreadCounter).where(UnreadCounter.scope.in_(list(QUEUE_STATES))))
+    conn.execute(text("DROP INDEX IF EXISTS ix_nominations_unread"))
+
+
+def m0005_last_log(conn):
+    add_columns(conn, Nomination.__table__, {'last_log_id', 'last_decided_at', 'last_role'})
+    backfill_last_log(conn)
+
+
+def m0006_nomination_version(conn):
+    add_columns(conn, Nomination.__table__, {'version'})
+
+
+def m0007_jobs(conn):
+    Job.__table__.create(conn, checkfirst=True)
+
+
+def m0008_analytics_rollups(conn):
+    AnalyticsRollup.__table__.create(conn, checkfirst=True)
+    create_indexes(conn, Nomination.__table__, {'ix_nominations_submission'})
+    create_indexes(conn, ApprovalLog.__table__, {'ix_approval_logs_timestamp'})
+
+
+def m0009_archive(conn):
+    ArchivedNomination.__table__.create(conn, checkfirst=True)
+    ArchivedApprovalLog.__table__.create(conn, checkfirst=True)
+    create_indexes(conn, Nomination.__table__, {'ix_nominations_final_status_decided'})
+
+
+def m0010_course_seats(conn):
+    add_columns(conn, TrainingCourse.__table__, {'capacity', 'seats_held', 'seats_confirmed'})
+    recount_seats(conn)
+
+
+def m0011_event_log(conn, batch_size=5000):
+    from projections import PROJECTIONS
+
+    for model in (DomainEvent, ProjectionOffset, TimelineEntry, CourseStats):
+        model.__table__.create(conn, checkfirst=True)
+
+    # One snapshot event per existing nomination, so the projections start
+    # from the current state rather than from an empty log.
+    if conn.execute(select(DomainEvent.id).limit(1)).first() is None:
+        rows = conn.execute(
+            select(Nomination.id, Nomination.user_id, Nomination.course_id, Nomination.status,
+                   Nomination.final_status, Nomination.rejection_reason, Nomination.submission_date)
+            .order_by(Nomination.id)
+        )
+        while batch := rows.fetchmany(batch_size):
+            conn.execute(insert(DomainEvent), [
+                event_row('nomination.snapshot', 'nomination', row.id, None, row.submission_date,
+                          employee_id=row.user_id, course_id=row.course_id, reason=row.rejection_reason,
+                          status=row.status, final_status=row.final_status)
+                for row in batch
+            ])
+
+    existing = set(conn.execute(select(ProjectionOffset.name)).scalars())
+    for name in PROJECTIONS:
+        if name not in existing:
+            conn.execute(insert(ProjectionOffset).values(name=name, position=0, updated_at=datetime.utcnow()))
+
+
+def m0012_cache_generations(conn):
+    CacheGeneration.__table__.create(conn, checkfirst=True)
+
+
+MIGRATIONS = [
+    ('0001_unread_counters', m0001_unread_counters),
+    ('0002_workflow_indexes', m0002_workflow_indexes),
+    ('0003_course_indexes', m0003_course_indexes),
+    ('0004_read_receipts', m0004_read_receipts),
+    ('0005_last_log', m0005_last_log),
+    ('0006_nomination_version', m0006_nomination_version),
+    ('0007_jobs', m0007_jobs),
+    ('0008_analytics_rollups', m0008_analytics_rollups),
+    ('0009_archive', m0009_archive),
+    ('0010_course_seats', m0010_course_seats),
+    ('0011_event_log', m0011_event_log),
+    ('0012_cache_generations', m0012_cache_generations),
+]
+
+
+# Applied versions are recorded in schema_migrations; upgrade() runs the
+# missing ones in order, each in its own transaction. Fresh databases get the
+# full schema from create_all() first, so every step must be safe to re-run.
+def upgrade():
+    """Applies pending migrations and returns their versions."""
+    db.create_all()
+
+    with db.engine.connect() as conn:
+        applied = set(conn.execute(select(schema_migrations.c.version)).scalars())
+
+    versions = []
+    for version, migrate in MIGRATIONS:
+        if version in applied:
+            continue
+        with db.engine.begin() as conn:
+            migrate(conn)
+            conn.execute(schema_migrations.insert().values(version=version, applied_at=datetime.utcnow()))
+        versions.append(version)
+    return versions
+
+
+if __name__ == '__main__':
+    import sys
+    from app import create_app
+
+    with create_app().app_context():
+        if sys.argv[1:] == ['backfill-last-log']:
+            with db.engine.begin() as conn:
+                backfill_last_log(conn)
+        elif sys.argv[1:] == ['recount-unread']:
+            print("recounted", recount_all(), "unread counters")
+        else:
+            for version in upgrade():
+                print("applied migration", version)
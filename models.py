@@ -0,0 +1,243 @@
+from datetime import datetime
+from flask_sqlalchemy import SQLAlchemy
+from database import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+class User(db.Model):
+    __tablename__ = 'users'
+    id = db.Column(db.Integer, primary_key=True)
+    full_name = db.Column(db.String(255), nullable=False)
+    national_id = db.Column(db.String(20), unique=True, nullable=False)
+    email = db.Column(db.String(255), unique=True, nullable=False)
+    phone_number = db.Column(db.String(20))
+    job_number = db.Column(db.String(50), unique=True)
+    qualification = db.Column(db.String(100))
+    specialization = db.Column(db.String(100))
+    role = db.Column(db.String(50), nullable=False)  
+    password_hash = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+class TrainingCourse(db.Model):
+    __tablename__ = 'training_courses'
+    id = db.Column(db.Integer, primary_key=True)
+    course_title = db.Column(db.String(255), nullable=False)
+    region = db.Column(db.String(100))
+    delivery_mode = db.Column(db.String(50))  
+    start_date = db.Column(db.Date)
+    duration_days = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Seats are held from the direct manager's approval and confirmed once the
+    # nomination is submitted to the institute; see seats.py. No capacity
+    # means the course takes any number of trainees.
+    capacity = db.Column(db.Integer)
+    seats_held = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    seats_confirmed = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def remaining_seats(self):
+        if self.capacity is None:
+            return None
+        return max(0, self.capacity - self.seats_held - self.seats_confirmed)
+
+    __table_args__ = (
+        db.Index('ix_training_courses_start_date', 'start_date', 'id'),
+        db.Index('ix_training_courses_region_mode', 'region', 'delivery_mode', 'start_date'),
+    )
+    
+class Nomination(db.Model):
+    __tablename__ = 'nominations'
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('training_courses.id'), nullable=False)
+    status = db.Column(db.String(50), default='pending')
+    submission_date = db.Column(db.DateTime, default=datetime.utcnow)
+    final_status = db.Column(db.String(50), default='draft')
+    rejection_reason = db.Column(db.Text)
+    is_read = db.Column(db.Boolean, default=False)
+    last_log_id = db.Column(db.Integer)
+    last_decided_at = db.Column(db.DateTime)
+    last_role = db.Column(db.String(50))
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    user = db.relationship('User', backref='nominations') 
+    course = db.relationship('TrainingCourse', backref='nominations')
+
+    approval_logs = db.relationship('ApprovalLog', backref='nomination', lazy=True, cascade="all, delete-orphan",
+                                    order_by='ApprovalLog.id')
+    # Latest decision, kept in step with every log write so dashboards show a
+    # row's status without loading its whole history.
+    last_log = db.relationship('ApprovalLog', primaryjoin='foreign(Nomination.last_log_id) == ApprovalLog.id',
+                               viewonly=True)
+
+    __table_args__ = (
+        db.Index('uq_nominations_user_course', 'user_id', 'course_id', unique=True),
+        db.Index('ix_nominations_status_submission', 'status', 'submission_date', 'id'),
+        db.Index('ix_nominations_final_status_submission', 'final_status', 'submission_date', 'id'),
+        db.Index('ix_nominations_user_submission', 'user_id', 'submission_date', 'id'),
+        db.Index('ix_nominations_submission', 'submission_date'),
+        db.Index('ix_nominations_final_status_decided', 'final_status', 'last_decided_at', 'id'),
+    )
+
+class ApprovalLog(db.Model):
+    __tablename__ = 'approval_logs'
+    id = db.Column(db.Integer, primary_key=True)
+    nomination_id = db.Column(db.Integer, db.ForeignKey('nominations.id'), nullable=False)
+    approved_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    role = db.Column(db.String(50))   
+    status = db.Column(db.String(50)) 
+    notes = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    is_read = db.Column(db.Boolean, default=False)
+
+    approver = db.relationship('User', foreign_keys=[approved_by])
+
+    __table_args__ = (
+        db.Index('ix_approval_logs_role_timestamp', 'role', 'timestamp', 'id'),
+        db.Index('ix_approval_logs_nomination_read', 'nomination_id', 'is_read'),
+        db.Index('ix_approval_logs_timestamp', 'timestamp'),
+    )
+
+# Finished nominations and their logs, moved out of the live tables by
+# archive.py. Same columns and ids as the originals, plus when they were moved.
+class ArchivedNomination(db.Model):
+    __tablename__ = 'nominations_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    course_id = db.Column(db.Integer, db.ForeignKey('training_courses.id'), nullable=False)
+    status = db.Column(db.String(50))
+    submission_date = db.Column(db.DateTime)
+    final_status = db.Column(db.String(50))
+    rejection_reason = db.Column(db.Text)
+    is_read = db.Column(db.Boolean)
+    last_log_id = db.Column(db.Integer)
+    last_decided_at = db.Column(db.DateTime)
+    last_role = db.Column(db.String(50))
+    version = db.Column(db.Integer, nullable=False, default=0)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_nominations_archive_user_submission', 'user_id', 'submission_date', 'id'),
+        db.Index('ix_nominations_archive_submission', 'submission_date', 'id'),
+    )
+
+class ArchivedApprovalLog(db.Model):
+    __tablename__ = 'approval_logs_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nomination_id = db.Column(db.Integer, db.ForeignKey('nominations_archive.id'), nullable=False)
+    approved_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    role = db.Column(db.String(50))
+    status = db.Column(db.String(50))
+    notes = db.Column(db.Text)
+    timestamp = db.Column(db.DateTime)
+    is_read = db.Column(db.Boolean)
+
+    __table_args__ = (
+        db.Index('ix_approval_logs_archive_nomination', 'nomination_id'),
+        db.Index('ix_approval_logs_archive_role_timestamp', 'role', 'timestamp', 'id'),
+    )
+
+class UnreadCounter(db.Model):
+    __tablename__ = 'unread_counters'
+    scope = db.Column(db.String(64), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+class NominationRead(db.Model):
+    __tablename__ = 'nomination_reads'
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    nomination_id = db.Column(db.Integer, db.ForeignKey('nominations.id'), primary_key=True)
+    read_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_nomination_reads_nomination', 'nomination_id'),
+    )
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    idempotency_key = db.Column(db.String(255), unique=True)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    run_after = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    locked_until = db.Column(db.DateTime)
+    last_error = db.Column(db.Text)
+    result = db.Column(db.Text)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_jobs_status_run_after', 'status', 'run_after', 'id'),
+    )
+
+
+class AnalyticsRollup(db.Model):
+    __tablename__ = 'analytics_rollups'
+    day = db.Column(db.Date, primary_key=True)
+    metric = db.Column(db.String(32), primary_key=True)
+    key = db.Column(db.String(255), primary_key=True)
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_analytics_rollups_metric_day', 'metric', 'day'),
+    )
+
+# Append-only record of every change made through the app; rows are only
+# ever inserted (see event_log.py). The id is the offset projections resume from.
+class DomainEvent(db.Model):
+    __tablename__ = 'domain_events'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(64), nullable=False)
+    aggregate = db.Column(db.String(32), nullable=False)
+    aggregate_id = db.Column(db.Integer)
+    actor_id = db.Column(db.Integer)
+    data = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        db.Index('ix_domain_events_aggregate', 'aggregate', 'aggregate_id', 'id'),
+    )
+
+class ProjectionOffset(db.Model):
+    __tablename__ = 'projection_offsets'
+    name = db.Column(db.String(64), primary_key=True)
+    position = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Read models maintained by projections.py from domain_events.
+class TimelineEntry(db.Model):
+    __tablename__ = 'employee_timeline'
+    event_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    nomination_id = db.Column(db.Integer)
+    course_id = db.Column(db.Integer)
+    kind = db.Column(db.String(64), nullable=False)
+    notes = db.Column(db.Text)
+    created_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_employee_timeline_user', 'user_id', 'event_id'),
+    )
+
+class CourseStats(db.Model):
+    __tablename__ = 'course_stats'
+    course_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    nominations = db.Column(db.Integer, nullable=False, default=0)
+    approved = db.Column(db.Integer, nullable=False, default=0)
+    submitted = db.Column(db.Integer, nullable=False, default=0)
+    rejected = db.Column(db.Integer, nullable=False, default=0)
+
+# Counters that cache keys are built from; see generations.py.
+class CacheGeneration(db.Model):
+    __tablename__ = 'cache_generations'
+    name = db.Column(db.String(128), primary_key=True)
+    value = db.Column(db.Integer, nullable=False, default=0)
+
+schema_migrations = db.Table(
+    'schema_migrations',
+    db.Column('version', db.String(64), primary_key=True),
+    db.Column('applied_at', db.DateTime, default=datetime.utcnow),
+)
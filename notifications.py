@@ -0,0 +1,173 @@
+from datetime import datetime
+from sqlalchemy import String, cast, exists, func, insert, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from models import db, Nomination, ApprovalLog, NominationRead, UnreadCounter
+from queries import nominations_for
+
+
+DROPDOWN_SIZE = 10
+
+# Badge counts are kept in unread_counters, one row per viewer:
+# '<role>:<user_id>' for approvers (nominations in their queue without a read
+# receipt) and 'employee:<user_id>' for unread decision logs. Every route that
+# changes what a viewer would count bumps the rows in the same transaction, so
+# reading a badge is a primary-key lookup.
+QUEUE_STATES = {
+    'admin': {'status': 'pending'},
+    'hr': {'status': 'approved', 'final_status': 'draft'},
+    'entry': {'status': 'approved', 'final_status': 'approved'},
+}
+
+
+def viewer_scope(role, user_id):
+    return f'{role}:{user_id}'
+
+
+def employee_scope(user_id):
+    return viewer_scope('employee', user_id)
+
+
+def queue_role(status, final_status):
+    if status == 'pending':
+        return 'admin'
+    if status == 'approved' and final_status == 'draft':
+        return 'hr'
+    if status == 'approved' and final_status == 'approved':
+        return 'entry'
+    return None
+
+
+def nomination_queue(nomination):
+    return queue_role(nomination.status, nomination.final_status)
+
+
+def queue_filter(role):
+    return [getattr(Nomination, column) == value for column, value in QUEUE_STATES[role].items()]
+
+
+def not_read_by(user_id):
+    return ~exists().where(
+        NominationRead.nomination_id == Nomination.id,
+        NominationRead.user_id == user_id
+    )
+
+
+def unread_nominations_for(role, user_id):
+    return nominations_for(role).filter(*queue_filter(role), not_read_by(user_id))
+
+
+def unread_query(scope):
+    role, _, user_id = scope.partition(':')
+    user_id = int(user_id)
+    if role == 'employee':
+        return ApprovalLog.query \
+            .join(Nomination) \
+            .filter(Nomination.user_id == user_id, ApprovalLog.is_read == False)
+    return Nomination.query.filter(*queue_filter(role), not_read_by(user_id))
+
+
+def unread_count(scope):
+    counter = db.session.get(UnreadCounter, scope)
+    if counter is not None:
+        return counter.count
+
+    # First read of this scope: seed the counter from a COUNT(*) once, on its
+    # own connection so the request's session is not committed mid-render.
+    # The count is taken on the primary with the INSERT: later deltas apply to
+    # this base, so a lagging replica's count would stay wrong for good.
+    statement = unread_query(scope).order_by(None).with_entities(func.count()).statement
+    try:
+        with db.engine.begin() as conn:
+            count = conn.execute(statement).scalar()
+            conn.execute(insert(UnreadCounter).values(scope=scope, count=count))
+    except IntegrityError:
+        pass
+    return count
+
+
+def bump(scope, delta):
+    if scope is None or not delta:
+        return
+    db.session.execute(
+        update(UnreadCounter)
+        .where(UnreadCounter.scope == scope)
+        .values(count=UnreadCounter.count + delta)
+    )
+
+
+def enter_queue(role, count=1):
+    if role is None or not count:
+        return
+    db.session.execute(
+        update(UnreadCounter)
+        .where(UnreadCounter.scope.like(f'{role}:%'))
+        .values(count=UnreadCounter.count + count)
+    )
+
+
+def leave_queue(role, nomination_ids):
+    # Each viewer of the queue loses the nominations it had not read yet.
+    if role is None or not nomination_ids:
+        return
+    already_read = select(func.count()) \
+        .where(
+            NominationRead.nomination_id.in_(nomination_ids),
+            UnreadCounter.scope == literal(f'{role}:') + cast(NominationRead.user_id, String)
+        ) \
+        .correlate(UnreadCounter) \
+        .scalar_subquery()
+    db.session.execute(
+        update(UnreadCounter)
+        .where(UnreadCounter.scope.like(f'{role}:%'))
+        .values(count=UnreadCounter.count - (len(nomination_ids) - already_read))
+    )
+
+
+def nomination_moved(before, nomination):
+    after = nomination_queue(nomination)
+    if before != after:
+        leave_queue(before, [nomination.id])
+        enter_queue(after)
+
+
+def mark_read(role, user_id, nomination_ids=None):
+    """Write read receipts for the viewer's unread queue items with one
+    INSERT ... SELECT; nomination_ids=None marks the whole queue."""
+    source = select(literal(user_id), Nomination.id, literal(datetime.utcnow())) \
+        .where(*queue_filter(role), not_read_by(user_id))
+    if nomination_ids is not None:
+        source = source.where(Nomination.id.in_(nomination_ids))
+
+    result = db.session.execute(
+        insert(NominationRead).from_select(['user_id', 'nomination_id', 'read_at'], source)
+    )
+    bump(viewer_scope(role, user_id), -result.rowcount)
+    return result.rowcount
+
+
+def mark_logs_read(user_id, log_ids=None):
+    statement = update(ApprovalLog) \
+        .where(
+            ApprovalLog.is_read == False,
+            ApprovalLog.nomination_id.in_(select(Nomination.id).where(Nomination.user_id == user_id))
+        )
+    if log_ids is not None:
+        statement = statement.where(ApprovalLog.id.in_(log_ids))
+
+    result = db.session.execute(
+        statement.values(is_read=True).execution_options(synchronize_session=False)
+    )
+    bump(employee_scope(user_id), -result.rowcount)
+    return result.rowcount
+
+
+def recount_all():
+    scopes = [c.scope for c in UnreadCounter.query.all()]
+    for scope in scopes:
+        db.session.execute(
+            update(UnreadCounter)
+            .where(UnreadCounter.scope == scope)
+            .values(count=unread_query(scope).order_by(None).count())
+        )
+    db.session.commit()
+    return len(scopes)
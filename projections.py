@@ -0,0 +1,232 @@
+"""Read models built from the domain_events log by a separate worker:
+
+    python projections.py --follow
+    python projections.py --rebuild course_stats
+
+Each projection stores the id of the last event it applied in
+projection_offsets and picks up from there, applying up to
+PROJECTION_BATCH_SIZE events per transaction together with the new offset, so
+a worker can be stopped at any point. Rebuilding empties a read model and
+replays the whole log into it in one transaction, so readers keep seeing the
+old rows until it commits.
+
+Event ids are handed out when a transaction writes them, not when it commits,
+so a worker stops at a gap in the ids until the event after it is
+PROJECTION_GAP_SECONDS old, by which time the missing id belongs to a
+transaction that rolled back.
+"""
+import argparse
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select, update
+from models import db, TrainingCourse, DomainEvent, ProjectionOffset, TimelineEntry, CourseStats
+from dashboard_cache import invalidate, nominations_scope
+
+
+PROJECTION_BATCH_SIZE = int(os.getenv("PROJECTION_BATCH_SIZE", 1000))
+PROJECTION_POLL_SECONDS = float(os.getenv("PROJECTION_POLL_SECONDS", 1))
+PROJECTION_GAP_SECONDS = int(os.getenv("PROJECTION_GAP_SECONDS", 30))
+
+TIMELINE_SIZE = 10
+
+TIMELINE_LABELS = {
+    'nomination.snapshot': 'حالة الطلب عند بدء السجل',
+    'nomination.created': 'تم تقديم طلب الترشيح',
+    'nomination.admin.approve': 'تمت الموافقة من الرئيس المباشر',
+    'nomination.admin.reject': 'تم الرفض من الرئيس المباشر',
+    'nomination.hr.approve': 'تمت الموافقة من الموارد البشرية',
+    'nomination.hr.reject': 'تم الرفض من الموارد البشرية',
+    'nomination.entry.approve': 'تم الاعتماد النهائي ورفع الترشيح إلى معهد الإدارة',
+    'nomination.entry.submit': 'تم رفع الترشيح إلى معهد الإدارة',
+    'nomination.entry.reject': 'تم رفض الاعتماد النهائي',
+    'nomination.delivered': 'تم إرسال الترشيح إلى معهد الإدارة بنجاح',
+}
+
+# Nomination event -> course_stats columns it adds one to.
+COURSE_STAT_KINDS = {
+    'nomination.created': ['nominations'],
+    'nomination.admin.approve': ['approved'],
+    'nomination.admin.reject': ['rejected'],
+    'nomination.hr.reject': ['rejected'],
+    'nomination.entry.approve': ['submitted'],
+    'nomination.entry.submit': ['submitted'],
+    'nomination.entry.reject': ['rejected'],
+}
+
+
+def apply_timeline(events):
+    rows = [
+        {
+            'event_id': event.id,
+            'user_id': data['employee_id'],
+            'nomination_id': event.aggregate_id,
+            'course_id': data.get('course_id'),
+            'kind': event.kind,
+            'notes': data.get('reason'),
+            'created_at': event.created_at,
+        }
+        for event, data in events
+        if event.aggregate == 'nomination' and data.get('employee_id')
+    ]
+    if rows:
+        db.session.execute(insert(TimelineEntry), rows)
+    return [nominations_scope(user_id) for user_id in {row['user_id'] for row in rows}]
+
+
+def snapshot_stats(data):
+    columns = ['nominations']
+    if data['status'] == 'rejected':
+        columns.append('rejected')
+    elif data['status'] == 'approved':
+        columns.append('approved')
+    if data['final_status'] in ('submitted', 'final_submitted'):
+        columns.append('submitted')
+    return columns
+
+
+def apply_course_stats(events):
+    deltas = defaultdict(Counter)
+    for event, data in events:
+        if event.aggregate != 'nomination' or not data.get('course_id'):
+            continue
+        columns = snapshot_stats(data) if event.kind == 'nomination.snapshot' else COURSE_STAT_KINDS.get(event.kind, [])
+        deltas[data['course_id']].update(columns)
+
+    for course_id, counts in sorted(deltas.items()):
+        updated = db.session.execute(
+            update(CourseStats)
+            .where(CourseStats.course_id == course_id)
+            .values({getattr(CourseStats, column): getattr(CourseStats, column) + count
+                     for column, count in counts.items()})
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        if not updated:
+            db.session.execute(insert(CourseStats).values(course_id=course_id, **counts))
+    return []
+
+
+# name -> (function applying a batch of (event, data) pairs and returning the
+# dashboard cache scopes it changed, read model tables a rebuild empties)
+PROJECTIONS = {
+    'employee_timeline': (apply_timeline, [TimelineEntry]),
+    'course_stats': (apply_course_stats, [CourseStats]),
+}
+
+
+def ready_events(position, batch_size):
+    events = db.session.execute(
+        select(DomainEvent)
+        .where(DomainEvent.id > position)
+        .order_by(DomainEvent.id)
+        .limit(batch_size)
+    ).scalars().all()
+
+    settled = datetime.utcnow() - timedelta(seconds=PROJECTION_GAP_SECONDS)
+    ready = []
+    for event in events:
+        if event.id != position + 1 and event.created_at > settled:
+            break
+        ready.append((event, json.loads(event.data)))
+        position = event.id
+    return ready
+
+
+def locked_offset(name):
+    offset = db.session.get(ProjectionOffset, name, with_for_update=True)
+    if offset is None:
+        offset = ProjectionOffset(name=name, position=0)
+        db.session.add(offset)
+    return offset
+
+
+def advance(name, batch_size=PROJECTION_BATCH_SIZE):
+    """Applies the next batch of events to one projection and returns how
+    many were applied."""
+    apply, _ = PROJECTIONS[name]
+    offset = locked_offset(name)
+    events = ready_events(offset.position, batch_size)
+    if not events:
+        db.session.rollback()
+        return 0
+
+    scopes = apply(events)
+    offset.position = events[-1][0].id
+    offset.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    invalidate(*scopes)
+    return len(events)
+
+
+def catch_up(names=None, batch_size=PROJECTION_BATCH_SIZE):
+    applied = 0
+    for name in names or PROJECTIONS:
+        while True:
+            count = advance(name, batch_size)
+            applied += count
+            if count < batch_size:
+                break
+    return applied
+
+
+def rebuild(name, batch_size=PROJECTION_BATCH_SIZE):
+    apply, tables = PROJECTIONS[name]
+    offset = locked_offset(name)
+    for table in tables:
+        db.session.execute(delete(table))
+
+    position = 0
+    scopes = set()
+    while True:
+        events = ready_events(position, batch_size)
+        if not events:
+            break
+        scopes.update(apply(events))
+        position = events[-1][0].id
+
+    offset.position = position
+    offset.updated_at = datetime.utcnow()
+    db.session.commit()
+
+    invalidate(*scopes)
+    return position
+
+
+def timeline(user_id, limit=TIMELINE_SIZE):
+    return TimelineEntry.query \
+        .filter_by(user_id=user_id) \
+        .order_by(TimelineEntry.event_id.desc()) \
+        .limit(limit) \
+        .all()
+
+
+def course_stats(limit=None):
+    statement = select(TrainingCourse.course_title, TrainingCourse.region, CourseStats) \
+        .join(CourseStats, CourseStats.course_id == TrainingCourse.id) \
+        .order_by(CourseStats.nominations.desc(), TrainingCourse.id) \
+        .limit(limit)
+    return db.session.execute(statement).all()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Maintain the read models built from domain events.")
+    parser.add_argument('--follow', action='store_true', help="keep polling for new events")
+    parser.add_argument('--rebuild', choices=list(PROJECTIONS), action='append', default=[])
+    parser.add_argument('--batch-size', type=int, default=PROJECTION_BATCH_SIZE)
+    args = parser.parse_args()
+
+    from app import create_app
+
+    with create_app().app_context():
+        for name in args.rebuild:
+            print("rebuilt", name, "up to event", rebuild(name, args.batch_size))
+        while True:
+            applied = catch_up(batch_size=args.batch_size)
+            if not args.follow:
+                print("applied", applied, "events")
+                break
+            if not applied:
+                time.sleep(PROJECTION_POLL_SECONDS)
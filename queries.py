@@ -0,0 +1,180 @@
+from datetime import datetime
+from sqlalchemy import select, tuple_, union_all
+from sqlalchemy.orm import aliased, contains_eager, joinedload
+from models import db, User, TrainingCourse, Nomination, ApprovalLog, ArchivedNomination, ArchivedApprovalLog
+
+
+# Loader options per dashboard, matching the relationships each template
+# touches for every row. Without them a page with N rows issues N lazy loads.
+NOMINATION_LOADERS = {
+    'admin': lambda: (
+        joinedload(Nomination.user),
+        joinedload(Nomination.course),
+    ),
+    'hr': lambda: (
+        joinedload(Nomination.user),
+        joinedload(Nomination.course),
+    ),
+    'entry': lambda: (
+        joinedload(Nomination.user),
+        joinedload(Nomination.course),
+    ),
+    'employee': lambda: (
+        joinedload(Nomination.course),
+        joinedload(Nomination.last_log).joinedload(ApprovalLog.approver),
+    ),
+}
+
+
+def nomination_options(role):
+    return NOMINATION_LOADERS.get(role, NOMINATION_LOADERS['employee'])()
+
+
+def nominations_for(role):
+    return Nomination.query.options(*nomination_options(role))
+
+
+def approval_logs_for(role):
+    # The history tables always join to nominations for filtering, so the
+    # same join is reused to populate log.nomination instead of a second load.
+    return ApprovalLog.query \
+        .join(ApprovalLog.nomination) \
+        .options(
+            contains_eager(ApprovalLog.nomination).joinedload(Nomination.user),
+            contains_eager(ApprovalLog.nomination).joinedload(Nomination.course),
+        )
+
+
+PAGE_SIZE = 20
+
+
+def encode_cursor(moment, row_id):
+    return f"{moment.isoformat()}_{row_id}"
+
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        moment, row_id = cursor.rsplit('_', 1)
+        return datetime.fromisoformat(moment), int(row_id)
+    except ValueError:
+        return None
+
+
+def keyset_page(query, date_column, id_column, cursor=None, per_page=PAGE_SIZE):
+    # Newest first; the cursor is the (date, id) of the last row already shown,
+    # so each page is an index range scan no matter how deep the history is.
+    position = decode_cursor(cursor)
+    if position:
+        query = query.filter(tuple_(date_column, id_column) < tuple_(*position))
+
+    rows = query \
+        .order_by(date_column.desc(), id_column.desc()) \
+        .limit(per_page + 1) \
+        .all()
+
+    next_cursor = None
+    if len(rows) > per_page:
+        rows = rows[:per_page]
+        last = rows[-1]
+        next_cursor = encode_cursor(getattr(last, date_column.key), getattr(last, id_column.key))
+
+    return rows, next_cursor
+
+
+def nominations_page(query, cursor=None, per_page=PAGE_SIZE):
+    return keyset_page(query, Nomination.submission_date, Nomination.id, cursor, per_page)
+
+
+def approval_logs_page(query, cursor=None, per_page=PAGE_SIZE):
+    return keyset_page(query, ApprovalLog.timestamp, ApprovalLog.id, cursor, per_page)
+
+
+
+# Column-only rows for the JSON API: the fields a client needs, selected
+# directly rather than through full entities and their relationships. The
+# same selects run over the archive tables, which share the live columns.
+NOMINATION_FIELDS = ['id', 'status', 'final_status', 'submission_date', 'rejection_reason', 'version']
+
+APPROVAL_LOG_FIELDS = ['id', 'nomination_id', 'role', 'status', 'notes', 'timestamp']
+
+Approver = aliased(User)
+
+# What each role may list, matching the rows its dashboard is built from.
+NOMINATION_SCOPES = {
+    'admin': lambda nominations, user_id: [],
+    'manager': lambda nominations, user_id: [],
+    'hr': lambda nominations, user_id: [nominations.status == 'approved'],
+    'entry': lambda nominations, user_id: [
+        nominations.final_status.in_(['approved', 'submitted', 'final_submitted'])
+    ],
+    'employee': lambda nominations, user_id: [nominations.user_id == user_id],
+}
+
+APPROVAL_LOG_SCOPES = {
+    'admin': lambda logs, nominations, user_id: [logs.role.in_(['admin', 'manager'])],
+    'manager': lambda logs, nominations, user_id: [logs.role.in_(['admin', 'manager'])],
+    'hr': lambda logs, nominations, user_id: [logs.role == 'hr'],
+    'entry': lambda logs, nominations, user_id: [logs.role == 'entry'],
+    'employee': lambda logs, nominations, user_id: [nominations.user_id == user_id],
+}
+
+
+def nomination_select(nominations, role, user_id, filters):
+    scope = NOMINATION_SCOPES.get(role, NOMINATION_SCOPES['employee'])
+    return select(
+        *(getattr(nominations, field) for field in NOMINATION_FIELDS),
+        User.full_name.label('employee'),
+        User.job_number,
+        TrainingCourse.id.label('course_id'),
+        TrainingCourse.course_title.label('course'),
+        TrainingCourse.region,
+        TrainingCourse.delivery_mode,
+        TrainingCourse.start_date,
+    ) \
+        .select_from(nominations) \
+        .join(User, nominations.user_id == User.id) \
+        .join(TrainingCourse, nominations.course_id == TrainingCourse.id) \
+        .where(*scope(nominations, user_id)) \
+        .where(*(getattr(nominations, field) == value for field, value in filters.items()))
+
+
+def approval_log_select(logs, nominations, role, user_id, filters):
+    scope = APPROVAL_LOG_SCOPES.get(role, APPROVAL_LOG_SCOPES['employee'])
+    return select(
+        *(getattr(logs, field) for field in APPROVAL_LOG_FIELDS),
+        User.full_name.label('employee'),
+        TrainingCourse.course_title.label('course'),
+        Approver.full_name.label('approver'),
+    ) \
+        .select_from(logs) \
+        .join(nominations, logs.nomination_id == nominations.id) \
+        .join(User, nominations.user_id == User.id) \
+        .join(TrainingCourse, nominations.course_id == TrainingCourse.id) \
+        .outerjoin(Approver, logs.approved_by == Approver.id) \
+        .where(*scope(logs, nominations, user_id)) \
+        .where(*(getattr(logs, field) == value for field, value in filters.items()))
+
+
+def nomination_rows(role, user_id, include_archived=False, **filters):
+    """The nominations `role` may list, as a subquery for rows_page();
+    include_archived adds the archived ones with UNION ALL."""
+    statement = nomination_select(Nomination, role, user_id, filters)
+    if include_archived:
+        statement = union_all(statement, nomination_select(ArchivedNomination, role, user_id, filters))
+    return statement.subquery('nomination_rows')
+
+
+def approval_log_rows(role, user_id, include_archived=False, **filters):
+    statement = approval_log_select(ApprovalLog, Nomination, role, user_id, filters)
+    if include_archived:
+        statement = union_all(
+            statement,
+            approval_log_select(ArchivedApprovalLog, ArchivedNomination, role, user_id, filters)
+        )
+    return statement.subquery('approval_log_rows')
+
+
+def rows_page(rows, date_field, cursor=None, per_page=PAGE_SIZE):
+    return keyset_page(db.session.query(rows), rows.c[date_field], rows.c.id, cursor, per_page)
@@ -0,0 +1,178 @@
+import bisect
+import os
+import re
+import threading
+from collections import defaultdict
+from datetime import date
+from courses import GENERATION_KEY, course_row
+from database import primary
+from generations import generations
+from models import TrainingCourse
+
+
+COURSE_SEARCH_LIMIT = int(os.getenv("COURSE_SEARCH_LIMIT", 60))
+
+FACETS = ['region', 'delivery_mode', 'month']
+
+DIACRITICS = re.compile('[\u0610-\u061a\u0640\u064b-\u065f\u0670\u06d6-\u06ed]')
+LETTER_FOLDS = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ى': 'ي', 'ئ': 'ي', 'ؤ': 'و',
+    'ة': 'ه',
+})
+WORD = re.compile(r'\w+')
+ARTICLE = 'ال'
+
+
+def normalize(text):
+    return DIACRITICS.sub('', text or '').translate(LETTER_FOLDS).casefold()
+
+
+def query_tokens(text):
+    return WORD.findall(normalize(text))
+
+
+def index_tokens(text):
+    # Titles are also indexed without the definite article, so "تدريب"
+    # finds "التدريب" while "التدريب" still matches itself.
+    tokens = set()
+    for token in query_tokens(text):
+        tokens.add(token)
+        if token.startswith(ARTICLE) and len(token) > len(ARTICLE) + 1:
+            tokens.add(token[len(ARTICLE):])
+    return tokens
+
+
+def facet_values(row):
+    start_date = row['start_date']
+    return {
+        'region': row['region'],
+        'delivery_mode': row['delivery_mode'],
+        'month': start_date.strftime('%Y-%m') if start_date else None,
+    }
+
+
+def sort_key(row):
+    return row['start_date'] or date.max, row['id']
+
+
+class CourseIndex:
+    """In-memory inverted index over course titles, with one id set per facet
+    value so counts are set intersections rather than scans."""
+
+    def __init__(self):
+        self.generation = None
+        self.last_id = 0
+        self.rows = {}
+        self.postings = defaultdict(set)
+        self.vocabulary = []
+        self.facets = {field: defaultdict(set) for field in FACETS}
+        self.order = []
+        self.lock = threading.RLock()
+
+    def add(self, row):
+        course_id = row['id']
+        with self.lock:
+            self.rows[course_id] = row
+            for token in index_tokens(row['course_title']):
+                if token not in self.postings:
+                    bisect.insort(self.vocabulary, token)
+                self.postings[token].add(course_id)
+            for field, value in facet_values(row).items():
+                if value:
+                    self.facets[field][value].add(course_id)
+            bisect.insort(self.order, sort_key(row))
+            self.last_id = max(self.last_id, course_id)
+
+    def prefix_ids(self, prefix):
+        ids = set()
+        position = bisect.bisect_left(self.vocabulary, prefix)
+        while position < len(self.vocabulary) and self.vocabulary[position].startswith(prefix):
+            ids |= self.postings[self.vocabulary[position]]
+            position += 1
+        return ids
+
+    def search(self, query='', filters=None, limit=COURSE_SEARCH_LIMIT, after=None):
+        """`after` is the sort key of the last course already shown; the
+        result's `next` is the one to pass for the following page."""
+        filters = {field: value for field, value in (filters or {}).items() if value and field in FACETS}
+
+        with self.lock:
+            matched = None
+            for token in query_tokens(query):
+                ids = self.prefix_ids(token)
+                matched = ids if matched is None else matched & ids
+                if not matched:
+                    break
+            if matched is None:
+                matched = set(self.rows)
+
+            # Each facet is counted with every filter applied except its own,
+            # so the options of a selected facet stay visible with counts.
+            facet_counts = {}
+            for field in FACETS:
+                scope = matched
+                for other, value in filters.items():
+                    if other != field:
+                        scope = scope & self.facets[other].get(value, set())
+                if len(scope) == len(self.rows):
+                    counts = {value: len(ids) for value, ids in self.facets[field].items()}
+                else:
+                    counts = {value: len(scope & ids) for value, ids in self.facets[field].items()}
+                facet_counts[field] = sorted((value, count) for value, count in counts.items() if count)
+
+            results = matched
+            for field, value in filters.items():
+                results = results & self.facets[field].get(value, set())
+
+            # Dense result sets are read off the presorted order; sparse ones
+            # are cheaper to sort directly.
+            if len(results) * 8 < len(self.order):
+                keys = sorted(sort_key(self.rows[course_id]) for course_id in results)
+                if after:
+                    keys = keys[bisect.bisect_right(keys, after):]
+                page = [course_id for _, course_id in keys[:limit + 1]]
+            else:
+                page = []
+                position = bisect.bisect_right(self.order, after) if after else 0
+                while position < len(self.order) and len(page) <= limit:
+                    course_id = self.order[position][1]
+                    if course_id in results:
+                        page.append(course_id)
+                    position += 1
+
+            next_key = sort_key(self.rows[page[limit - 1]]) if len(page) > limit else None
+            return {
+                'total': len(results),
+                'courses': [self.rows[course_id] for course_id in page[:limit]],
+                'facets': facet_counts,
+                'next': next_key,
+            }
+
+
+course_index = CourseIndex()
+
+
+def refresh_index():
+    # add_course and the importers bump the catalogue generation; courses are
+    # only ever appended, so catching up means loading the ids not yet seen.
+    generation = generations.get(GENERATION_KEY)
+    if generation == course_index.generation:
+        return
+    with course_index.lock:
+        if generation == course_index.generation:
+            return
+        with primary():
+            new_courses = TrainingCourse.query \
+                .filter(TrainingCourse.id > course_index.last_id) \
+                .order_by(TrainingCourse.id) \
+                .all()
+        for course in new_courses:
+            course_index.add(course_row(course))
+        course_index.generation = generation
+
+
+def search_courses(query='', region=None, delivery_mode=None, month=None, limit=COURSE_SEARCH_LIMIT, after=None):
+    refresh_index()
+    return course_index.search(query, {'region': region, 'delivery_mode': delivery_mode, 'month': month},
+                               limit, after)
@@ -0,0 +1,128 @@
+"""Seat reservations against TrainingCourse.capacity.
+
+A nomination holds a seat from the direct manager's approval until it is
+rejected or submitted to the institute, when the seat is released or
+confirmed. The counts are kept on the course row (seats_held,
+seats_confirmed), updated in the decision's own transaction, so the seats
+left in a course are read off one row.
+
+Holding is a guarded UPDATE that only succeeds while the course has room,
+which the database serializes per row however many approvers race for the
+last seat. Courses are always updated in id order so concurrent bulk
+decisions cannot deadlock on them.
+"""
+from collections import Counter, defaultdict
+from sqlalchemy import func, or_, select, update
+from models import db, TrainingCourse, Nomination, ArchivedNomination
+
+
+# Nomination states that hold or have confirmed a seat.
+HELD_STATES = {'status': 'approved', 'final_status': ['draft', 'approved']}
+CONFIRMED_STATES = {'status': 'approved', 'final_status': ['submitted', 'final_submitted']}
+
+
+def reserve(course_id, count):
+    """Holds up to `count` seats in a course and returns how many were held."""
+    has_room = or_(
+        TrainingCourse.capacity.is_(None),
+        TrainingCourse.seats_held + TrainingCourse.seats_confirmed + count <= TrainingCourse.capacity
+    )
+    held = db.session.execute(
+        update(TrainingCourse)
+        .where(TrainingCourse.id == course_id, has_room)
+        .values(seats_held=TrainingCourse.seats_held + count)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if held or count == 1:
+        return count if held else 0
+
+    # Not enough room for all of them: lock the row and take what is left.
+    course = db.session.execute(
+        select(TrainingCourse.capacity, TrainingCourse.seats_held, TrainingCourse.seats_confirmed)
+        .where(TrainingCourse.id == course_id)
+        .with_for_update()
+    ).one_or_none()
+    if course is None:
+        return 0
+    count = max(0, min(count, course.capacity - course.seats_held - course.seats_confirmed))
+    if count:
+        db.session.execute(
+            update(TrainingCourse)
+            .where(TrainingCourse.id == course_id)
+            .values(seats_held=TrainingCourse.seats_held + count)
+            .execution_options(synchronize_session=False)
+        )
+    return count
+
+
+def hold_seats(nominations):
+    """Holds a seat for each (id, course_id) row while its course has room
+    and returns the ids that got one, earliest nominations first."""
+    by_course = defaultdict(list)
+    for row in nominations:
+        by_course[row.course_id].append(row.id)
+
+    granted = []
+    for course_id in sorted(by_course):
+        ids = sorted(by_course[course_id])
+        granted += ids[:reserve(course_id, len(ids))]
+    return granted
+
+
+def move_seats(course_ids, held=0, confirmed=0):
+    """Adds `held` and `confirmed` seats to a course once for every time its
+    id appears in course_ids; negative numbers give seats back."""
+    for course_id, count in sorted(Counter(course_ids).items()):
+        db.session.execute(
+            update(TrainingCourse)
+            .where(TrainingCourse.id == course_id)
+            .values(
+                seats_held=TrainingCourse.seats_held + held * count,
+                seats_confirmed=TrainingCourse.seats_confirmed + confirmed * count
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+
+def release_seats(course_ids):
+    move_seats(course_ids, held=-1)
+
+
+def confirm_seats(course_ids):
+    move_seats(course_ids, held=-1, confirmed=1)
+
+
+def remaining_seats(course_ids):
+    """{course_id: seats left} for the given courses; None for no limit."""
+    if not course_ids:
+        return {}
+    rows = db.session.execute(
+        select(TrainingCourse.id, TrainingCourse.capacity, TrainingCourse.seats_held,
+               TrainingCourse.seats_confirmed)
+        .where(TrainingCourse.id.in_(course_ids))
+    )
+    return {
+        row.id: None if row.capacity is None else max(0, row.capacity - row.seats_held - row.seats_confirmed)
+        for row in rows
+    }
+
+
+def in_states(states, model=Nomination):
+    return (model.status == states['status']) & model.final_status.in_(states['final_status'])
+
+
+def recount_seats(conn=None):
+    """Rebuilds every course's counts from the nominations, e.g. after
+    enabling capacities on existing data or to repair drift. Nominations
+    archive.py has moved to nominations_archive keep their confirmed seats."""
+    def count_in(states, model=Nomination):
+        return select(func.count()) \
+            .where(model.course_id == TrainingCourse.id, in_states(states, model)) \
+            .scalar_subquery()
+
+    (conn or db.session).execute(
+        update(TrainingCourse).values(
+            seats_held=count_in(HELD_STATES),
+            seats_confirmed=count_in(CONFIRMED_STATES) + count_in(CONFIRMED_STATES, ArchivedNomination)
+        )
+    )
@@ -0,0 +1,96 @@
+// Keeps an approver's notification badge and dropdown in step with /events,
+// so nominations entering or leaving the queue show up without reloading.
+(function () {
+  const script = document.currentScript;
+  const button = document.getElementById('notifIcon');
+  const dropdown = document.getElementById('messagesDropdown');
+  if (!window.EventSource || !button || !dropdown) {
+    return;
+  }
+
+  const limit = parseInt(script.dataset.limit || '10', 10);
+
+  function setBadge(count) {
+    let badge = button.querySelector('.badge');
+    if (count > 0) {
+      if (!badge) {
+        badge = document.createElement('span');
+        badge.className = 'position-absolute top-0 start-100 translate-middle badge rounded-pill bg-danger';
+        button.appendChild(badge);
+      }
+      badge.textContent = count;
+    } else if (badge) {
+      badge.remove();
+    }
+  }
+
+  function list() {
+    let ul = dropdown.querySelector('ul');
+    if (!ul) {
+      const empty = dropdown.querySelector('.text-center.p-3');
+      if (empty) {
+        empty.remove();
+      }
+      ul = document.createElement('ul');
+      ul.className = 'list-unstyled m-0';
+      dropdown.insertBefore(ul, dropdown.firstChild);
+    }
+    return ul;
+  }
+
+  function prepend(nominationId, value, title, detail, date) {
+    const li = document.createElement('li');
+    li.className = 'd-flex justify-content-between align-items-start p-2 border-bottom';
+    li.dataset.nominationId = nominationId;
+
+    const body = document.createElement('div');
+    const strong = document.createElement('strong');
+    strong.textContent = title;
+    const small = document.createElement('small');
+    small.className = 'text-muted';
+    small.textContent = date || '';
+    body.append(strong, document.createElement('br'), detail || '', document.createElement('br'), small);
+
+    const form = document.createElement('form');
+    form.method = 'POST';
+    form.action = script.dataset.markUrl;
+    const input = document.createElement('input');
+    input.type = 'hidden';
+    input.name = script.dataset.field;
+    input.value = value;
+    const close = document.createElement('button');
+    close.type = 'submit';
+    close.className = 'btn btn-sm btn-link text-danger p-0';
+    close.title = 'إغلاق';
+    close.textContent = '×';
+    form.append(input, close);
+
+    li.append(body, form);
+    const ul = list();
+    ul.insertBefore(li, ul.firstChild);
+    while (ul.children.length > limit) {
+      ul.lastElementChild.remove();
+    }
+  }
+
+  const source = new EventSource(script.dataset.url);
+
+  source.addEventListener('queued', function (e) {
+    const data = JSON.parse(e.data);
+    data.nominations.forEach(function (n) {
+      prepend(n.id, n.id, n.full_name, n.course_title, n.submission_date);
+    });
+    setBadge(data.unread);
+  });
+
+  source.addEventListener('dequeued', function (e) {
+    const data = JSON.parse(e.data);
+    data.ids.forEach(function (id) {
+      const item = dropdown.querySelector('li[data-nomination-id="' + id + '"]');
+      if (item) {
+        item.remove();
+      }
+    });
+    setBadge(data.unread);
+  });
+})();
@@ -0,0 +1,116 @@
+import os
+import sys
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read when the modules are imported: no rendered page is reused between
+# requests, and generation counters are only re-read from the database when
+# a test clears them, so statement counts do not depend on timing.
+os.environ['DASHBOARD_CACHE_SIZE'] = '0'
+os.environ['CACHE_GENERATION_SECONDS'] = '3600'
+
+import pytest
+from sqlalchemy import event
+from werkzeug.security import generate_password_hash
+import auth
+import courses
+import search
+from app import create_app
+from generations import generations
+from migrations import backfill_last_log, upgrade
+from models import db, User, TrainingCourse, Nomination, ApprovalLog
+
+
+ROLES = ['admin', 'hr', 'entry', 'employee']
+
+# (status, final_status, approval logs) in the order a nomination moves
+# through the workflow, seeded in equal shares.
+STATES = [
+    ('pending', 'draft', []),
+    ('approved', 'draft', [('admin', 'approved')]),
+    ('approved', 'approved', [('admin', 'approved'), ('hr', 'approved')]),
+    ('approved', 'submitted', [('admin', 'approved'), ('hr', 'approved'), ('entry', 'submitted')]),
+    ('rejected', 'rejected', [('admin', 'rejected')]),
+]
+
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'test.db'))
+    app = create_app({'TESTING': True})
+
+    # Process-wide caches from a previous test describe another database.
+    generations.clear()
+    auth.local_cache.clear()
+    courses.local_cache.clear()
+    monkeypatch.setattr(search, 'course_index', search.CourseIndex())
+
+    with app.app_context():
+        upgrade()
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def seed(app):
+    def seed(size):
+        """Creates one user per role and `size` courses, each with a
+        nomination from its own employee and one from the 'employee' user.
+        Returns the role users' ids."""
+        password_hash = generate_password_hash('pw', method='pbkdf2:sha256:1')
+        users = {}
+        for role in ROLES:
+            users[role] = User(full_name=f'{role} user', national_id=role, email=f'{role}@example.com',
+                               job_number=role, role=role, password_hash=password_hash)
+            db.session.add(users[role])
+        db.session.flush()
+
+        for i in range(size):
+            course = TrainingCourse(course_title=f'دورة {i}', region='ينبع', delivery_mode='حضوري',
+                                    start_date=date(2026, 1, 1) + timedelta(days=i), duration_days=3)
+            employee = User(full_name=f'موظف {i}', national_id=f'e{i}', email=f'e{i}@example.com',
+                            job_number=f'e{i}', role='employee', password_hash=password_hash)
+            db.session.add_all([course, employee])
+            db.session.flush()
+
+            for offset, user in enumerate([employee, users['employee']]):
+                status, final_status, logs = STATES[(i + offset) % len(STATES)]
+                nomination = Nomination(user_id=user.id, course_id=course.id, status=status,
+                                        final_status=final_status)
+                db.session.add(nomination)
+                db.session.flush()
+                for role, log_status in logs:
+                    db.session.add(ApprovalLog(nomination_id=nomination.id, approved_by=users[role].id,
+                                               role=role, status=log_status))
+        db.session.commit()
+
+        with db.engine.begin() as conn:
+            backfill_last_log(conn)
+        return {role: user.id for role, user in users.items()}
+    return seed
+
+
+@pytest.fixture
+def statements(app):
+    """The SQL statements run since the list was last cleared."""
+    executed = []
+
+    def collect(conn, cursor, statement, *args):
+        executed.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', collect)
+    yield executed
+    event.remove(db.engine, 'before_cursor_execute', collect)
+
+
+@pytest.fixture
+def client_for(app):
+    def client_for(user_id, role):
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+            session['user_role'] = role
+        return client
+    return client_for
@@ -0,0 +1,29 @@
+"""Each dashboard runs a fixed number of SQL statements, however many
+nominations, logs and courses there are."""
+import pytest
+
+
+DASHBOARDS = [
+    ('admin', '/dashboard', 4),
+    ('admin', '/dashboard?filter_status=approved', 4),
+    ('hr', '/dashboard', 4),
+    ('hr', '/dashboard-hr', 3),
+    ('entry', '/dashboard', 4),
+    ('entry', '/dashboard_entry', 2),
+    ('employee', '/dashboard', 6),
+]
+
+
+@pytest.mark.parametrize('size', [5, 40])
+@pytest.mark.parametrize('role, path, expected', DASHBOARDS)
+def test_dashboard_statement_count(seed, client_for, statements, size, role, path, expected):
+    ids = seed(size)
+    client = client_for(ids[role], role)
+
+    # The first request loads what later ones reuse: the signed-in user's
+    # profile, the course index and the cache generations.
+    assert client.get(path).status_code == 200
+
+    statements.clear()
+    assert client.get(path).status_code == 200
+    assert len(statements) == expected, statements
@@ -0,0 +1,70 @@
+"""Every statement a dashboard runs reaches its rows through an index: SQLite's
+EXPLAIN QUERY PLAN must not show a full scan of any table."""
+import re
+import pytest
+from sqlalchemy import event
+from models import db
+
+
+DASHBOARDS = [
+    ('admin', '/dashboard'),
+    ('admin', '/dashboard?filter_status=approved'),
+    ('hr', '/dashboard'),
+    ('hr', '/dashboard-hr'),
+    ('entry', '/dashboard'),
+    ('entry', '/dashboard_entry'),
+    ('employee', '/dashboard'),
+]
+
+# "SCAN nominations" ("SCAN TABLE nominations" before SQLite 3.36) reads the
+# whole table; "SCAN nominations USING INDEX ..." walks an index in order and
+# "SEARCH ..." seeks into one.
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?\w+$')
+
+
+def query_plans(client, path):
+    """(statement, plan steps) for every statement of a warmed-up request."""
+    assert client.get(path).status_code == 200
+
+    executed = []
+
+    def collect(conn, cursor, statement, parameters, *args):
+        executed.append((statement, parameters))
+
+    event.listen(db.engine, 'before_cursor_execute', collect)
+    try:
+        assert client.get(path).status_code == 200
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', collect)
+
+    with db.engine.connect() as conn:
+        return [
+            (statement, [row[-1] for row in conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters)])
+            for statement, parameters in executed
+        ]
+
+
+@pytest.mark.parametrize('role, path', DASHBOARDS)
+def test_dashboard_queries_use_indexes(seed, client_for, role, path):
+    ids = seed(40)
+    plans = query_plans(client_for(ids[role], role), path)
+
+    assert plans
+    for statement, plan in plans:
+        assert not [step for step in plan if FULL_SCAN.match(step)], (statement, plan)
+
+
+# The HR and entry queues filter on both status and final_status, so either
+# composite index serves them; SQLite picks one or the other.
+@pytest.mark.parametrize('role, indexes', [
+    ('admin', ['ix_nominations_status_submission']),
+    ('hr', ['ix_nominations_status_submission', 'ix_nominations_final_status_submission']),
+    ('entry', ['ix_nominations_status_submission', 'ix_nominations_final_status_submission']),
+    ('employee', ['ix_nominations_user_submission']),
+])
+def test_queue_uses_its_index(seed, client_for, role, indexes):
+    ids = seed(40)
+    plans = query_plans(client_for(ids[role], role), '/dashboard')
+
+    steps = [step for _, plan in plans for step in plan]
+    assert any(f'USING INDEX {index}' in step for step in steps for index in indexes), steps
@@ -0,0 +1,82 @@
+"""Blueprints, one per role plus `main` for the pages every user shares,
+and the view helpers they have in common."""
+from flask import flash, jsonify, redirect, request, session, url_for
+from decisions import decide, decide_many, parse_ids
+
+
+def register_views(app):
+    from views import main, employee, admin, hr, entry, api
+
+    for module in (main, employee, admin, hr, entry, api):
+        app.register_blueprint(module.bp)
+
+    app.add_template_global(page_url)
+    app.add_template_filter(translate_status)
+
+
+def page_url(**params):
+    args = request.args.to_dict()
+    args.update(params)
+    return url_for(request.endpoint, **args)
+
+
+def translate_status(status):
+    return {
+        'approved': 'تمت الموافقة',
+        'rejected': 'تم الرفض',
+        'submitted': 'تم الإرسال'
+    }.get(status, status)
+
+
+def redirect_by_role(role):
+    if role == 'employee':
+        return redirect(url_for('main.dashboard'))
+    elif role == 'manager':
+        return redirect(url_for('main.dashboard'))
+    elif role == 'admin':
+        return redirect(url_for('main.dashboard'))
+    elif role == 'hr':
+        return redirect(url_for('main.dashboard'))
+    elif role == 'entry':
+        return redirect(url_for('main.dashboard'))
+    else:
+        return redirect(url_for('main.login'))
+
+
+def single_decision(role, action, log_role=None):
+    # The form carries the version the row was rendered with, so a decision
+    # made on a stale page is refused instead of overwriting a newer one.
+    version = parse_ids([request.form.get('version')])
+    result = decide(role, action, request.form.get('nomination_id'), session['user_id'],
+                    request.form.get('rejection_reason'), log_role, version[0] if version else None)
+    if result == 'full':
+        flash('تعذر تنفيذ القرار: لا توجد مقاعد متاحة في هذه الدورة.', 'warning')
+    elif result != 'updated':
+        flash('تعذر تنفيذ القرار: تم تحديث الترشيح من مستخدم آخر.', 'warning')
+    return result == 'updated'
+
+
+def bulk_decision(role, action):
+    payload = request.get_json(silent=True)
+    if payload is not None and not isinstance(payload, dict):
+        return jsonify(error="invalid payload"), 400
+    payload = payload or {}
+    nomination_ids = payload.get('nomination_ids') or request.form.getlist('nomination_ids')
+    reason = payload.get('rejection_reason') or request.form.get('rejection_reason')
+
+    # A string would be read digit by digit as separate ids.
+    if not isinstance(nomination_ids, list) or \
+            any(isinstance(nid, bool) or not isinstance(nid, (int, str)) for nid in nomination_ids):
+        return jsonify(error="nomination_ids must be a list of ids"), 400
+    if not isinstance(reason, (str, type(None))):
+        return jsonify(error="rejection_reason must be a string"), 400
+
+    results = decide_many(role, action, nomination_ids, session['user_id'], reason,
+                          log_role=session['user_role'])
+
+    return jsonify(
+        results=[{'nomination_id': nid, 'result': result} for nid, result in results.items()],
+        updated=sum(1 for result in results.values() if result == 'updated'),
+        skipped=sum(1 for result in results.values() if result == 'skipped'),
+        full=sum(1 for result in results.values() if result == 'full')
+    )
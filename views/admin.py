@@ -0,0 +1,112 @@
+from flask import Blueprint, render_template, request, redirect, session, url_for, jsonify
+from models import User, TrainingCourse, Nomination, ApprovalLog
+from auth import current_user
+from database import read_replica
+from notifications import DROPDOWN_SIZE, unread_count, unread_nominations_for, viewer_scope
+from queries import nominations_for, approval_logs_for, nominations_page, approval_logs_page
+from views import single_decision, bulk_decision
+
+
+bp = Blueprint('admin', __name__)
+
+
+def dashboard(user):
+    filter_status = request.args.get('filter_status')
+    new_requests_count = unread_count(viewer_scope('admin', user.id))
+
+    nominations, next_cursor = nominations_page(
+        nominations_for('admin').filter_by(status='pending'),
+        request.args.get('cursor')
+    )
+    unread_nominations = unread_nominations_for('admin', user.id) \
+        .order_by(Nomination.submission_date.desc()) \
+        .limit(DROPDOWN_SIZE) \
+        .all()
+
+    logs_query = approval_logs_for('admin') \
+        .filter(
+            ApprovalLog.role == 'admin',
+            Nomination.status.in_(['approved', 'rejected'])
+        )
+    if filter_status:
+        logs_query = logs_query.filter(ApprovalLog.status == filter_status)
+    previous_logs, next_log_cursor = approval_logs_page(logs_query, request.args.get('log_cursor'))
+
+    return render_template(
+        'dashboard_admin.html',
+        user=user,
+        nominations=nominations,
+        next_cursor=next_cursor,
+        new_requests_count=new_requests_count,
+        unread_nominations=unread_nominations,
+        previous_logs=previous_logs,
+        next_log_cursor=next_log_cursor,
+        filter_status=filter_status
+    )
+
+@bp.route('/admin_panel')
+@read_replica
+def admin_panel():
+    if 'user_role' not in session or session['user_role'] != 'admin':
+        return redirect(url_for('main.login'))
+
+    nominations = nominations_for('admin').join(TrainingCourse).join(User).all()
+    new_requests_count = unread_count(viewer_scope('admin', session['user_id']))
+
+    return render_template('admin_panel.html',
+                           nominations=nominations,
+                           new_requests_count=new_requests_count)
+
+@bp.route('/dashboard')
+def admin_dashboard():
+    if session.get('user_role') != 'admin':
+        return redirect(url_for('main.login'))
+
+    filter_status = request.args.get('filter_status')
+
+    if filter_status:
+        nominations = nominations_for('admin').filter_by(status=filter_status).all()
+    else:
+        nominations = nominations_for('admin').all()
+
+    user_id = session.get('user_id')
+    unread_nominations = unread_nominations_for('admin', user_id) \
+        .order_by(Nomination.submission_date.desc()) \
+        .limit(DROPDOWN_SIZE) \
+        .all()
+    new_requests_count = unread_count(viewer_scope('admin', user_id))
+
+    user = current_user()
+
+    return render_template(
+        'dashboard_admin.html',
+        nominations=nominations,
+        new_requests_count=new_requests_count,
+        unread_nominations=unread_nominations,
+        filter_status=filter_status,
+        user=user
+    )
+
+
+@bp.route('/admin_decide', methods=['POST'])
+def admin_decide():
+    if 'user_role' not in session or session['user_role'] not in ['admin', 'manager']:
+        return redirect(url_for('main.login'))
+
+    action = request.form.get('action')
+    if action in ('approve', 'reject'):
+        single_decision('admin', action, log_role=session['user_role'])
+
+    return redirect(url_for('admin.admin_dashboard'))
+
+@bp.route('/admin_decide_bulk', methods=['POST'])
+def admin_decide_bulk():
+    if 'user_role' not in session or session['user_role'] not in ['admin', 'manager']:
+        return redirect(url_for('main.login'))
+
+    payload = request.get_json(silent=True)
+    action = (payload if isinstance(payload, dict) else request.form).get('action')
+    if action not in ('approve', 'reject'):
+        return jsonify(error="invalid action"), 400
+
+    return bulk_decision('admin', action)
@@ -0,0 +1,109 @@
+"""Versioned JSON API over the same queries as the dashboards, for pages that
+fetch their tables incrementally and for mobile clients. Lists are keyset
+paginated: each response carries the `next_cursor` to pass back as `cursor`.
+Nominations and logs moved out by archive.py are included with
+include_archived=1.
+"""
+import gzip
+import os
+from datetime import date, datetime
+from flask import Blueprint, jsonify, request, session
+from database import read_replica
+from queries import PAGE_SIZE, approval_log_rows, encode_cursor, nomination_rows, rows_page
+from search import search_courses
+from seats import remaining_seats
+from views.employee import course_after, course_search_args
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+API_MAX_PAGE_SIZE = int(os.getenv("API_MAX_PAGE_SIZE", 100))
+API_COMPRESS_MIN_BYTES = int(os.getenv("API_COMPRESS_MIN_BYTES", 1024))
+
+bp = Blueprint('api', __name__, url_prefix='/api/v1')
+
+
+@bp.before_request
+def require_login():
+    if 'user_id' not in session:
+        return jsonify(error="unauthorized"), 401
+
+
+@bp.after_request
+def compress(response):
+    response.vary.add('Accept-Encoding')
+    if response.status_code != 200 or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+
+    body = response.get_data()
+    if len(body) < API_COMPRESS_MIN_BYTES:
+        return response
+
+    if brotli is not None and 'br' in request.accept_encodings:
+        response.set_data(brotli.compress(body, quality=5))
+        response.headers['Content-Encoding'] = 'br'
+    elif 'gzip' in request.accept_encodings:
+        response.set_data(gzip.compress(body, compresslevel=6))
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def page_size():
+    try:
+        return max(1, min(int(request.args.get('limit', PAGE_SIZE)), API_MAX_PAGE_SIZE))
+    except ValueError:
+        return PAGE_SIZE
+
+
+def serialize(fields):
+    return {
+        name: value.isoformat() if isinstance(value, (date, datetime)) else value
+        for name, value in fields.items()
+    }
+
+
+def page_response(rows, next_cursor, **extra):
+    return jsonify(items=[serialize(row._asdict()) for row in rows], next_cursor=next_cursor, **extra)
+
+
+def include_archived():
+    return request.args.get('include_archived') in ('1', 'true')
+
+
+def filters(*fields):
+    return {field: request.args[field] for field in fields if request.args.get(field)}
+
+
+@bp.route('/nominations')
+@read_replica
+def nominations():
+    rows = nomination_rows(session.get('user_role'), session['user_id'], include_archived(),
+                           **filters('status', 'final_status', 'course_id'))
+    page, next_cursor = rows_page(rows, 'submission_date', request.args.get('cursor'), page_size())
+    return page_response(page, next_cursor)
+
+
+@bp.route('/approval-logs')
+@read_replica
+def approval_logs():
+    rows = approval_log_rows(session.get('user_role'), session['user_id'], include_archived(),
+                             **filters('status', 'nomination_id'))
+    page, next_cursor = rows_page(rows, 'timestamp', request.args.get('cursor'), page_size())
+    return page_response(page, next_cursor)
+
+
+@bp.route('/courses')
+@read_replica
+def courses():
+    result = search_courses(**course_search_args(), limit=page_size(), after=course_after(request.args.get('cursor')))
+    seats = remaining_seats([course['id'] for course in result['courses']])
+    return jsonify(
+        items=[serialize(dict(course, remaining_seats=seats.get(course['id']))) for course in result['courses']],
+        next_cursor=encode_cursor(*result['next']) if result['next'] else None,
+        total=result['total'],
+        facets={field: [{'value': value, 'count': count} for value, count in counts]
+                for field, counts in result['facets'].items()}
+    )
@@ -0,0 +1,176 @@
+from flask import Blueprint, current_app, render_template, request, redirect, session, url_for, jsonify
+from sqlalchemy.exc import IntegrityError
+from models import db, TrainingCourse, Nomination, ApprovalLog
+from auth import current_user
+from database import read_replica
+from dashboard_cache import invalidate, invalidate_transition, user_scope
+from decisions import parse_ids
+from events import publish_transition
+from event_log import record
+from notifications import (
+    DROPDOWN_SIZE, unread_count, employee_scope, nomination_queue, nomination_moved, mark_logs_read
+)
+from projections import TIMELINE_LABELS, timeline
+from queries import nominations_for, approval_logs_for, nominations_page, decode_cursor, encode_cursor
+from search import search_courses
+from seats import remaining_seats
+from views import redirect_by_role
+
+
+bp = Blueprint('employee', __name__)
+
+
+def course_search_args():
+    return {
+        'query': request.args.get('q', '').strip(),
+        'region': request.args.get('region'),
+        'delivery_mode': request.args.get('delivery_mode'),
+        'month': request.args.get('month'),
+    }
+
+def course_after(cursor):
+    # Course cursors carry the (start_date, id) of the last course shown.
+    position = decode_cursor(cursor)
+    return (position[0].date(), position[1]) if position else None
+
+def dashboard(user):
+    user_id = user.id
+    status_filter = request.args.get('filter_status')
+    course_filter = request.args.get('filter_course')
+    new_requests_count = unread_count(employee_scope(user_id))
+
+    course_search = search_courses(**course_search_args(), after=course_after(request.args.get('course_cursor')))
+
+    nominations_query = nominations_for('employee').filter_by(user_id=user_id)
+    if status_filter:
+        nominations_query = nominations_query.filter_by(status=status_filter)
+    if course_filter:
+        nominations_query = nominations_query.filter_by(course_id=course_filter)
+    nominations, next_cursor = nominations_page(nominations_query, request.args.get('cursor'))
+
+    nominated_courses = TrainingCourse.query \
+        .join(Nomination) \
+        .filter(Nomination.user_id == user_id) \
+        .order_by(TrainingCourse.course_title) \
+        .all()
+    submitted_courses = [c.id for c in nominated_courses]
+
+    unread_logs = approval_logs_for('employee') \
+        .filter(
+            Nomination.user_id == user.id,
+            ApprovalLog.is_read == False
+        ) \
+        .order_by(ApprovalLog.timestamp.desc()) \
+        .limit(DROPDOWN_SIZE) \
+        .all()
+
+    return render_template(
+        'dashboard_employee.html',
+        user=user,
+        nominations=nominations,
+        next_cursor=next_cursor,
+        courses=course_search['courses'],
+        course_search=course_search,
+        next_course_cursor=encode_cursor(*course_search['next']) if course_search['next'] else None,
+        seats=remaining_seats([course['id'] for course in course_search['courses']]),
+        submitted_courses=submitted_courses,
+        nominated_courses=nominated_courses,
+        unread_logs=unread_logs,
+        new_requests_count=new_requests_count,
+        timeline=timeline(user_id),
+        timeline_labels=TIMELINE_LABELS,
+        course_titles={course.id: course.course_title for course in nominated_courses}
+    )
+
+def manager_dashboard(user):
+    course_search = search_courses(**course_search_args())
+
+    return render_template(
+        'dashboard_manager.html',
+        user=user,
+        courses=course_search['courses'],
+        course_search=course_search
+    )
+
+@bp.route('/courses/search')
+@read_replica
+def course_search():
+    if 'user_id' not in session:
+        return jsonify(error="unauthorized"), 401
+
+    result = search_courses(**course_search_args())
+    return jsonify(
+        total=result['total'],
+        courses=[
+            dict(course, start_date=course['start_date'].isoformat() if course['start_date'] else None)
+            for course in result['courses']
+        ],
+        facets={field: [{'value': value, 'count': count} for value, count in counts]
+                for field, counts in result['facets'].items()}
+    )
+
+@bp.route('/new_nomination', methods=['POST'])
+def new_nomination():
+    user_id = session.get('user_id')
+    if not user_id:
+        return redirect(url_for('main.login'))
+
+    course_id = request.form['course_id']
+    justification = request.form.get('justification', 'طلب ترشيح')
+
+    user = current_user()
+    current_app.logger.info("الموظف الذي يطلب الترشيح: %s", user.full_name)
+
+    existing = Nomination.query.filter_by(user_id=user_id, course_id=course_id).first()
+    if existing:
+        return redirect_by_role(user.role)
+
+    # Pending nominations hold no seat, so this only turns away requests for
+    # a course that is already full; the approval itself is what is guarded.
+    if remaining_seats([int(course_id)]).get(int(course_id)) == 0:
+        return redirect_by_role(user.role)
+
+    nomination = Nomination(
+        user_id=user_id,
+        course_id=course_id,
+        status='pending',
+        final_status='draft'
+    )
+
+    db.session.add(nomination)
+    nomination_moved(None, nomination)
+    queued_for = nomination_queue(nomination)
+    try:
+        db.session.flush()
+        record('nomination.created', 'nomination', nomination.id, user_id,
+               employee_id=user_id, course_id=int(course_id), status=nomination.status, final_status=nomination.final_status)
+        db.session.commit()
+        invalidate_transition(None, queued_for, [user_id])
+        publish_transition(None, queued_for, [nomination.id])
+    except IntegrityError:
+        # uq_nominations_user_course: a concurrent request nominated first.
+        db.session.rollback()
+
+    return redirect_by_role(user.role)
+
+@bp.route('/mark-log-as-read', methods=['POST'])
+def mark_log_as_read():
+    if 'user_id' not in session:
+        return redirect(url_for('main.login'))
+
+    log_ids = parse_ids(request.form.getlist('log_ids') or [request.form.get('log_id')])
+    if log_ids:
+        mark_logs_read(session['user_id'], log_ids)
+        db.session.commit()
+        invalidate(user_scope(session['user_id']))
+    return redirect(url_for('main.dashboard'))
+
+@bp.route('/mark-all-logs-as-read', methods=['POST'])
+def mark_all_logs_as_read():
+    if 'user_id' not in session:
+        return redirect(url_for('main.login'))
+
+    mark_logs_read(session['user_id'])
+    db.session.commit()
+    invalidate(user_scope(session['user_id']))
+    return redirect(url_for('main.dashboard'))
@@ -0,0 +1,117 @@
+from flask import Blueprint, render_template, request, redirect, session, url_for, flash
+from models import Nomination, ApprovalLog
+from auth import current_user
+from database import read_replica
+from dashboard_cache import cached_dashboard
+from notifications import DROPDOWN_SIZE, unread_count, unread_nominations_for, viewer_scope
+from queries import nominations_for, approval_logs_for, nominations_page, approval_logs_page
+from views import single_decision, bulk_decision
+
+
+bp = Blueprint('entry', __name__)
+
+
+def dashboard(user):
+    filter_status = request.args.get('filter_status')
+    new_requests_count = unread_count(viewer_scope('entry', user.id))
+
+    nominations, next_cursor = nominations_page(
+        nominations_for('entry').filter_by(status='approved', final_status='approved'),
+        request.args.get('cursor')
+    )
+    unread_nominations = unread_nominations_for('entry', user.id) \
+        .order_by(Nomination.submission_date.desc()) \
+        .limit(DROPDOWN_SIZE) \
+        .all()
+
+    logs_query = approval_logs_for('entry').filter(ApprovalLog.role == 'entry')
+    if filter_status:
+        logs_query = logs_query.filter(ApprovalLog.status == filter_status)
+    previous_logs, next_log_cursor = approval_logs_page(logs_query, request.args.get('log_cursor'))
+
+    return render_template(
+        'dashboard_entry.html',
+        user=user,
+        nominations=nominations,
+        next_cursor=next_cursor,
+        unread_nominations=unread_nominations,
+        new_requests_count=new_requests_count,
+        previous_logs=previous_logs,
+        next_log_cursor=next_log_cursor,
+        filter_status=filter_status
+    )
+
+@bp.route('/dashboard_entry')
+@read_replica
+@cached_dashboard
+def dashboard_entry():
+    if session.get('user_role') != 'entry':
+        return redirect(url_for('main.login'))
+
+    user = current_user()
+
+    filter_status = request.args.get('filter_status', 'all')
+
+    if filter_status == 'approved':
+        nominations_query = nominations_for('entry').filter_by(final_status='approved')
+    elif filter_status == 'submitted':
+        nominations_query = nominations_for('entry').filter(Nomination.final_status.in_(['submitted', 'final_submitted']))
+    else:
+        nominations_query = nominations_for('entry').filter(
+            Nomination.final_status.in_(['approved', 'submitted', 'final_submitted'])
+        )
+
+    nominations, next_cursor = nominations_page(nominations_query, request.args.get('cursor'))
+    new_requests_count = unread_count(viewer_scope('entry', user.id))
+
+    return render_template(
+        'dashboard_entry.html',
+        user=user,
+        nominations=nominations,
+        next_cursor=next_cursor,
+        filter_status=filter_status,
+        new_requests_count=new_requests_count
+    )
+
+@bp.route('/entry_decide', methods=['POST'])
+def entry_decide():
+    if session.get('user_role') != 'entry':
+        return redirect(url_for('main.login'))
+
+    single_decision('entry', 'approve')
+
+    return redirect(url_for('entry.dashboard_entry'))
+
+
+@bp.route('/entry_submit', methods=['POST'])
+def entry_submit():
+    if session.get('user_role') != 'entry':
+        return redirect(url_for('main.login'))
+
+    if single_decision('entry', 'submit'):
+        flash('تم رفع الترشيح إلى معهد الإدارة.', 'success')
+    return redirect(url_for('main.dashboard'))
+
+
+@bp.route('/entry_reject', methods=['POST'])
+def entry_reject():
+    if session.get('user_role') != 'entry':
+        return redirect(url_for('main.login'))
+
+    single_decision('entry', 'reject')
+
+    return redirect(url_for('main.dashboard'))
+
+@bp.route('/entry_decide_bulk', methods=['POST'])
+def entry_decide_bulk():
+    if session.get('user_role') != 'entry':
+        return redirect(url_for('main.login'))
+
+    return bulk_decision('entry', 'approve')
+
+@bp.route('/entry_reject_bulk', methods=['POST'])
+def entry_reject_bulk():
+    if session.get('user_role') != 'entry':
+        return redirect(url_for('main.login'))
+
+    return bulk_decision('entry', 'reject')
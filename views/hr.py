@@ -0,0 +1,251 @@
+from datetime import date, datetime
+from flask import (
+    Blueprint, render_template, request, redirect, session, url_for, flash, jsonify, Response,
+    abort, stream_with_context
+)
+from models import db, TrainingCourse, Nomination, ApprovalLog
+from auth import current_user
+from courses import invalidate_courses
+from database import read_replica
+from dashboard_cache import cached_dashboard
+from event_log import record
+from projections import course_stats
+from notifications import DROPDOWN_SIZE, unread_count, unread_nominations_for, viewer_scope
+from queries import nominations_for, approval_logs_for, nominations_page, approval_logs_page
+from views import single_decision, bulk_decision
+
+
+bp = Blueprint('hr', __name__)
+
+last_role_ar = {
+    'admin': 'الرئيس المباشر',
+    'hr': 'مدير الموارد البشرية',
+    'entry': 'مدخل الترشيحات'
+}
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+}
+
+
+def dashboard(user):
+    filter_status = request.args.get('filter_status')
+    new_requests_count = unread_count(viewer_scope('hr', user.id))
+
+    nominations, next_cursor = nominations_page(
+        nominations_for('hr').filter_by(status='approved', final_status='draft'),
+        request.args.get('cursor')
+    )
+    unread_nominations = unread_nominations_for('hr', user.id) \
+        .order_by(Nomination.submission_date.desc()) \
+        .limit(DROPDOWN_SIZE) \
+        .all()
+
+    logs_query = approval_logs_for('hr') \
+        .filter(
+            ApprovalLog.role == 'hr',
+            Nomination.status.in_(['approved', 'rejected'])
+        )
+    if filter_status:
+        logs_query = logs_query.filter(ApprovalLog.status == filter_status)
+    previous_logs, next_log_cursor = approval_logs_page(logs_query, request.args.get('log_cursor'))
+
+    return render_template(
+        'dashboard_hr_manager.html',
+        user=user,
+        nominations=nominations,
+        next_cursor=next_cursor,
+        new_requests_count=new_requests_count,
+        unread_nominations=unread_nominations,
+        previous_logs=previous_logs,
+        next_log_cursor=next_log_cursor,
+        filter_status=filter_status,
+        last_role_ar=last_role_ar
+    )
+
+@bp.route('/dashboard-hr')
+@read_replica
+@cached_dashboard
+def dashboard_hr_manager():
+    if session.get('user_role') != 'hr':
+        return redirect(url_for('main.login'))
+
+    user = current_user()
+
+    filter_status = request.args.get('filter_status', 'all')
+
+    base_query = nominations_for('hr').filter(
+        Nomination.status == 'approved',
+        Nomination.final_status == 'draft'
+    )
+
+    if filter_status == 'approved':
+        base_query = base_query.filter(Nomination.final_status == 'approved')
+    elif filter_status == 'rejected':
+        base_query = base_query.filter(Nomination.final_status == 'rejected')
+
+    nominations, next_cursor = nominations_page(base_query, request.args.get('cursor'))
+
+    unread_nominations = unread_nominations_for('hr', user.id) \
+        .order_by(Nomination.submission_date.desc()) \
+        .limit(DROPDOWN_SIZE) \
+        .all()
+    new_requests_count = unread_count(viewer_scope('hr', user.id))
+
+    return render_template(
+        'dashboard_hr_manager.html',
+        user=user,
+        nominations=nominations,
+        next_cursor=next_cursor,
+        unread_nominations=unread_nominations,
+        new_requests_count=new_requests_count,
+        filter_status=filter_status
+    )
+
+
+@bp.route('/hr_decide', methods=['POST'])
+def hr_decide():
+    if 'user_id' not in session or session.get('user_role') != 'hr':
+        return redirect(url_for('main.login'))
+
+    decision = request.form.get('decision')
+    if decision in ('approve', 'reject'):
+        single_decision('hr', decision)
+
+    return redirect(url_for('hr.dashboard_hr_manager'))
+
+@bp.route('/hr_decide_bulk', methods=['POST'])
+def hr_decide_bulk():
+    if 'user_id' not in session or session.get('user_role') != 'hr':
+        return redirect(url_for('main.login'))
+
+    decision = (request.get_json(silent=True) or request.form).get('decision')
+    if decision not in ('approve', 'reject'):
+        return jsonify(error="invalid decision"), 400
+
+    return bulk_decision('hr', decision)
+
+# Exports, imports and reports pull in pandas and openpyxl, so their modules
+# are imported by the views that need them rather than at worker boot.
+
+def export_response(statement, columns, name, fmt):
+    from exports import stream_csv, stream_xlsx
+
+    headers = [header for header, _ in columns]
+    if fmt == 'xlsx':
+        body = stream_xlsx(statement, headers, name)
+    else:
+        body = stream_csv(statement, headers)
+
+    filename = f"{name}-{datetime.utcnow():%Y%m%d}.{fmt}"
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+@bp.route('/export/nominations.<fmt>')
+@read_replica
+def export_nominations(fmt):
+    from exports import NOMINATION_COLUMNS, nominations_statement
+
+    if session.get('user_role') not in ['hr', 'entry']:
+        return redirect(url_for('main.login'))
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    statement = nominations_statement(
+        status=request.args.get('status'),
+        final_status=request.args.get('final_status')
+    )
+    return export_response(statement, NOMINATION_COLUMNS, 'nominations', fmt)
+
+@bp.route('/export/approval-logs.<fmt>')
+@read_replica
+def export_approval_logs(fmt):
+    from exports import APPROVAL_LOG_COLUMNS, approval_logs_statement
+
+    if session.get('user_role') not in ['hr', 'entry']:
+        return redirect(url_for('main.login'))
+    if fmt not in EXPORT_FORMATS:
+        abort(404)
+
+    statement = approval_logs_statement(role=request.args.get('role'))
+    return export_response(statement, APPROVAL_LOG_COLUMNS, 'approval-logs', fmt)
+
+def parse_day(value):
+    try:
+        return date.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+@bp.route('/reports')
+@read_replica
+def reports():
+    from analytics import report
+
+    if session.get('user_role') != 'hr':
+        return redirect(url_for('main.login'))
+
+    figures = report(parse_day(request.args.get('from')), parse_day(request.args.get('to')))
+    return render_template('reports.html', report=figures, last_role_ar=last_role_ar, course_stats=course_stats())
+
+@bp.route('/add_course', methods=['GET', 'POST'])
+def add_course():
+    if request.method == 'POST':
+        course_title = request.form.get('course_title')
+        region = request.form.get('region')
+        delivery_mode = request.form.get('delivery_mode')
+        start_date = request.form.get('start_date')
+        duration_days = request.form.get('duration_days')
+        capacity = request.form.get('capacity')
+
+        if start_date:
+            start_date = datetime.strptime(start_date, '%Y-%m-%d')
+
+        new_course = TrainingCourse(
+            course_title=course_title,
+            region=region,
+            delivery_mode=delivery_mode,
+            start_date=start_date,
+            duration_days=int(duration_days),
+            capacity=int(capacity) if capacity else None
+        )
+        db.session.add(new_course)
+        db.session.flush()
+        record('course.created', 'course', new_course.id, session.get('user_id'),
+               course_title=course_title, region=region, delivery_mode=delivery_mode,
+               start_date=start_date, duration_days=new_course.duration_days, capacity=new_course.capacity)
+        db.session.commit()
+        invalidate_courses()
+        flash("تمت إضافة الدورة بنجاح!", "success")
+        return redirect(url_for('hr.dashboard_hr_manager'))
+
+    return render_template('add_course.html')
+
+@bp.route('/import/<kind>', methods=['GET', 'POST'])
+def import_data(kind):
+    from importers import read_rows, import_courses, import_users
+
+    importers = {
+        'courses': import_courses,
+        'users': import_users
+    }
+
+    if session.get('user_role') != 'hr':
+        return redirect(url_for('main.login'))
+    if kind not in importers:
+        abort(404)
+
+    report = None
+    if request.method == 'POST':
+        upload = request.files.get('file')
+        if not upload or not upload.filename:
+            return render_template('import_data.html', kind=kind, error="الرجاء اختيار ملف.")
+
+        report = importers[kind](read_rows(upload.filename, upload.stream), actor_id=session['user_id'])
+        if kind == 'courses' and report['inserted']:
+            invalidate_courses()
+
+    return render_template('import_data.html', kind=kind, report=report)
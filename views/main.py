@@ -0,0 +1,210 @@
+import math
+from flask import (
+    Blueprint, render_template, request, redirect, session, url_for, flash, jsonify, Response,
+    stream_with_context
+)
+from sqlalchemy.exc import IntegrityError
+from models import db, User, Nomination, Job
+from auth import authenticate, current_user, hash_password, invalidate_user, login_retry_after, login_succeeded
+from courses import featured_courses
+from database import read_replica
+from dashboard_cache import cached_dashboard, invalidate, user_scope
+from decisions import parse_ids
+from event_log import record
+from jobs import job_status
+from notifications import QUEUE_STATES, viewer_scope, mark_read, unread_nominations_for
+from events import event_stream, queue_channel
+from views import admin, employee, entry, hr
+
+
+bp = Blueprint('main', __name__)
+
+DASHBOARDS = {
+    'admin': admin.dashboard,
+    'hr': hr.dashboard,
+    'manager': employee.manager_dashboard,
+    'entry': entry.dashboard,
+}
+
+
+@bp.route('/')
+@read_replica
+def home():
+    return render_template('home.html',
+                           featured_courses=featured_courses())
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        job_number = request.form['job_number']
+        password = request.form['password']
+
+        retry_after = login_retry_after(request.remote_addr, job_number)
+        if retry_after:
+            page = render_template('login.html', error="محاولات دخول كثيرة، حاول مرة أخرى بعد قليل.")
+            return page, 429, {'Retry-After': str(math.ceil(retry_after))}
+
+        user = authenticate(job_number, password)
+
+        if user:
+            login_succeeded(request.remote_addr, job_number)
+            session['user_id'] = user.id
+            session['user_role'] = user.role
+            return redirect(url_for('main.dashboard'))
+
+        else:
+            return render_template('login.html', error="بيانات الدخول غير صحيحة.")
+
+    return render_template('login.html')
+
+@bp.route('/dashboard')
+@read_replica
+@cached_dashboard
+def dashboard():
+    user = current_user()
+    if user is None:
+        return redirect(url_for('main.login'))
+
+    return DASHBOARDS.get(user.role, employee.dashboard)(user)
+
+@bp.route('/register', methods=['GET', 'POST'])
+def register():
+    if request.method == 'POST':
+        profile = {
+            'full_name': request.form['full_name'],
+            'national_id': request.form['national_id'],
+            'email': request.form['email'],
+            'phone_number': request.form['phone'],
+            'job_number': request.form['job_number'],
+            'qualification': request.form['qualification'],
+            'specialization': request.form['specialization'],
+        }
+
+        existing_user = User.query.filter(
+            (User.job_number == profile['job_number']) |
+            (User.email == profile['email']) |
+            (User.national_id == profile['national_id'])
+        ).first()
+        if existing_user:
+            return render_template('register.html', error="يوجد مستخدم مسجل بهذه البيانات.")
+
+        # Hashed here rather than in a job, so the password is never stored
+        # anywhere but as its hash.
+        user = User(**profile, role='employee', password_hash=hash_password(request.form['password']))
+        db.session.add(user)
+        try:
+            db.session.flush()
+            record('user.registered', 'user', user.id, user.id, job_number=user.job_number, email=user.email)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # The same form submitted twice at once: the first one won.
+            same = User.query.filter_by(national_id=profile['national_id'], email=profile['email'],
+                                        job_number=profile['job_number']).first()
+            if same is None:
+                return render_template('register.html', error="يوجد مستخدم مسجل بهذه البيانات.")
+        except Exception as e:
+            db.session.rollback()
+            return render_template('register.html', error=f"حدث خطأ أثناء التسجيل: {str(e)}")
+
+        flash('تم التسجيل بنجاح، يمكنك تسجيل الدخول الآن.', 'success')
+        return redirect(url_for('main.login'))
+
+    return render_template('register.html')
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('main.login'))
+
+@bp.route('/update_user', methods=['POST'])
+def update_user():
+    if 'user_id' not in session:
+        return redirect(url_for('main.login'))
+
+    user = current_user()
+
+    full_name = request.form.get('full_name')
+    phone_number = request.form.get('phone_number')
+
+    user.full_name = full_name
+    user.phone_number = phone_number
+    record('user.updated', 'user', user.id, user.id, full_name=full_name, phone_number=phone_number)
+
+    db.session.commit()
+    invalidate_user(user.id)
+    invalidate(user_scope(user.id))
+
+    return redirect(url_for('main.dashboard'))
+
+@bp.route('/jobs/<int:job_id>')
+def job_detail(job_id):
+    job = db.session.get(Job, job_id)
+    allowed = job is not None and 'user_id' in session and \
+        (job.created_by == session['user_id'] or session.get('user_role') == 'hr')
+    if not allowed:
+        return jsonify(error="not found"), 404
+
+    return jsonify(job_status(job))
+
+
+@bp.route('/events')
+def events():
+    if 'user_id' not in session:
+        return redirect(url_for('main.login'))
+
+    # Only approvers hold a stream open: each one pins a worker thread, and
+    # 204 tells an EventSource not to reconnect.
+    role = session.get('user_role')
+    if role not in QUEUE_STATES:
+        return '', 204
+
+    return Response(
+        stream_with_context(event_stream(viewer_scope(role, session['user_id']), [queue_channel(role)])),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+@bp.route('/messages')
+def messages():
+    if session.get('user_role') not in QUEUE_STATES:
+        return redirect(url_for('main.login'))
+
+    role = session['user_role']
+    user_id = session['user_id']
+
+    nominations = unread_nominations_for(role, user_id) \
+        .order_by(Nomination.submission_date.desc()) \
+        .all()
+    page = render_template('messages.html', nominations=nominations)
+
+    mark_read(role, user_id)
+    db.session.commit()
+    invalidate(user_scope(user_id))
+
+    return page
+
+@bp.route('/mark-as-read', methods=['POST'])
+def mark_as_read():
+    if session.get('user_role') not in QUEUE_STATES:
+        return redirect(url_for('main.login'))
+
+    nomination_ids = parse_ids(request.form.getlist('nomination_ids') or [request.form.get('nomination_id')])
+    if nomination_ids:
+        mark_read(session['user_role'], session['user_id'], nomination_ids)
+        db.session.commit()
+        invalidate(user_scope(session['user_id']))
+
+    return redirect(url_for('main.dashboard'))
+
+@bp.route('/mark-all-as-read', methods=['POST'])
+def mark_all_as_read():
+    if session.get('user_role') not in QUEUE_STATES:
+        return redirect(url_for('main.login'))
+
+    mark_read(session['user_role'], session['user_id'])
+    db.session.commit()
+    invalidate(user_scope(session['user_id']))
+
+    return redirect(url_for('main.dashboard'))